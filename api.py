@@ -0,0 +1,331 @@
+"""ERP entegrasyonu için yerel HTTP dönüştürme servisi
+
+Çalışma kitabı multipart form alanı "file" ile gönderilir; yanıt seçilen
+formattaki çıktıdır (xlsx dışındakiler, uygulamadaki gibi zip). Yüklemeler
+asenkron sunucuda okunur, dönüşüm ve dışa aktarma uygulamanın kullandığı
+sınırlı işçi havuzunda çalışır; yavaş yüklemeler işçi tutmaz. Aynı içerik ve
+seçenekler için sonuç önbellekten döner, aynı anda gelen aynı istekler tek bir
+dönüşümü bekler.
+
+Kullanım:
+    python api.py --port 8502
+    curl -F "file=@siparis.xlsx" "http://127.0.0.1:8502/convert?format=csv" -o siparis.zip
+    python api.py --check siparis.xlsx
+
+--check servisi ağ açmadan süreç içinde çalıştırır ve dosyayı iki kez gönderir
+(ikincisi önbellekten gelmelidir).
+
+Servisin bağımlılıkları (starlette, uvicorn, python-multipart) ayrıca kurulur:
+    pip install -r requirements-api.txt
+
+Okunamayan çalışma kitapları ve mağaza sütunu bulunamayan dosyalar 422,
+hatalı istekler 400, beklenmeyen sunucu hataları 500 döner.
+
+SIPARIS_STORE_MASTER / SIPARIS_PRICE_LIST (veya --store-master / --price-list)
+verilirse çıktıya mağaza adları ve fiyatlar eklenir. Mağaza toplamı TOPLAM
+sütunuyla tutmayan ürün sayısı X-Total-Mismatches başlığında döner.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from collections import namedtuple
+from io import BytesIO
+from urllib.parse import quote, urlencode
+
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.formparsers import MultiPartException
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from converter import DEFAULT_THRESHOLD, STORE_PATTERN, OrderFileError, ResultCache, conversion_nbytes
+from enrichment import PRICE_LIST_PATH, STORE_MASTER_PATH, convert_checked, load_reference_data
+from exporter import EXPORT_FORMATS, cached_export, export_file_name, export_mime
+from jobs import JobCancelled, JobPool
+from shared_cache import DiskCache, SharedCache
+
+# Aynı anda işlenen (yüklenen veya dönüştürülen) istek sayısı; fazlası 503 alır
+MAX_CONCURRENT_REQUESTS = 8
+
+# Bu boyutun üzerindeki yüklemeler reddedilir
+MAX_UPLOAD_BYTES = 200 * 1024**2
+
+# Yanıt gövdesi bu boyutta parçalar halinde gönderilir
+RESPONSE_CHUNK_BYTES = 1024**2
+
+# Uygulamayla aynı disk önbelleği kullanılabilir (dönüşümler iki taraf arasında paylaşılır)
+DISK_CACHE_DIR = os.environ.get("SIPARIS_CACHE_DIR")
+
+# frame: dosya özeti -> okunan tablo (eşik değişince Excel yeniden okunmaz);
+# summary: dönüşüm anahtarı -> (satır sayısı, TOPLAM farkı); önbellekten dönen yanıtların başlıkları için
+ApiCaches = namedtuple("ApiCaches", ["conversion", "frame", "export", "summary"])
+
+class ApiError(Exception):
+    """İstemciye JSON hata yanıtı olarak dönen hata"""
+    
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+def convert_request(job, caches, key, data, original_filename, threshold, store_pattern, extension, reference):
+    """İşçide çalışır: dosyayı (önbellekte yoksa) dönüştür; (çıktı baytları, satır, TOPLAM farkı) döndür"""
+    cached = caches.conversion.get(key)
+    if cached is None:
+        job.report(0.05, "Dosya okunuyor")
+        conversion, _, reconciliation = convert_checked(
+            BytesIO(data), original_filename, threshold, store_pattern, reference=reference, frames=caches.frame, digest=key[0]
+        )
+        # Uygulamadaki kayıt biçimi (dönüşüm, mutabakat): disk önbelleği iki taraf arasında paylaşılır
+        cached = (conversion, reconciliation)
+        caches.conversion.put(key, cached, conversion_nbytes(conversion))
+    (store_cols, _, result), reconciliation = cached
+    if result is None:
+        raise ApiError(422, "Mağaza sütunları bulunamadı. Dosyada mağaza kodları ve TOPLAM sütunu olmalı.")
+    job.report(0.9, "Çıktı yazılıyor")
+    mismatches = len(reconciliation.mismatches) if reconciliation is not None else None
+    caches.summary.put(key, (len(result[0]), mismatches), 64)
+    return cached_export(caches.export, key, result, extension), len(result[0]), mismatches
+
+async def _read_upload(request):
+    """Multipart yüklemeden (dosya adı, baytlar) al; dosya olay döngüsünü bloklamadan okunur"""
+    length = request.headers.get("content-length")
+    if length is not None and length.isdigit() and int(length) > MAX_UPLOAD_BYTES:
+        raise ApiError(413, f"Dosya {MAX_UPLOAD_BYTES // 1024**2} MB sınırını aşıyor")
+    try:
+        form = await request.form(max_files=1, max_fields=10)
+    except (HTTPException, MultiPartException) as exc:
+        raise ApiError(400, f"Form okunamadı: {getattr(exc, 'detail', exc)}") from None
+    upload = form.get("file")
+    if upload is None or isinstance(upload, str):
+        raise ApiError(400, '"file" alanında bir Excel dosyası gönderilmeli')
+    try:
+        data = await upload.read()
+    finally:
+        await form.close()
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise ApiError(413, f"Dosya {MAX_UPLOAD_BYTES // 1024**2} MB sınırını aşıyor")
+    return upload.filename or "siparis.xlsx", data
+
+def _int_param(request, name, default, minimum=None):
+    value = request.query_params.get(name)
+    if value is None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ApiError(400, f"{name} bir tam sayı olmalı") from None
+    if minimum is not None and number < minimum:
+        raise ApiError(400, f"{name} en az {minimum} olmalı")
+    return number
+
+async def convert_endpoint(request):
+    """POST /convert?format=xlsx|csv|csv.gz|parquet&threshold=N"""
+    state = request.app.state
+    extension = request.query_params.get("format", "xlsx")
+    if extension not in EXPORT_FORMATS.values():
+        raise ApiError(400, f"Desteklenmeyen format: {extension} ({', '.join(EXPORT_FORMATS.values())})")
+    threshold = _int_param(request, "threshold", DEFAULT_THRESHOLD, minimum=0)
+    try:
+        # Referans dosyaları değişmedikçe bellekten gelir; imzaları önbellek anahtarına girer
+        reference = load_reference_data(*state.reference_paths)
+    except (OSError, ValueError) as exc:
+        raise ApiError(500, f"Referans dosyası okunamadı: {exc}") from None
+    
+    # Sınır dolduysa istek sıraya alınmaz; istemci Retry-After ile yeniden dener
+    if state.slots.locked():
+        raise ApiError(503, "Sunucu meşgul, lütfen biraz sonra tekrar deneyin")
+    async with state.slots:
+        started = time.perf_counter()
+        original_filename, data = await _read_upload(request)
+        key = ResultCache.make_key(data, original_filename, threshold, STORE_PATTERN, reference.signature)
+        export_key = (key, extension, True, True)
+        
+        cached = state.caches.export.get(export_key)
+        summary = state.caches.summary.get(key)
+        # Başlıklardaki satır sayısı da önbellekte yoksa dönüşüm işine gidilir (çıktı yine önbellekten gelir)
+        cache_status = "hit" if cached is not None and summary is not None else "miss"
+        if cache_status == "miss":
+            # Aynı dosya ve format için süren iş varsa ona katılınır
+            job = state.pool.submit_shared(
+                export_key, original_filename, convert_request,
+                state.caches, key, data, original_filename, threshold, STORE_PATTERN, extension, reference
+            )
+            try:
+                output, rows, mismatches = await asyncio.wrap_future(job.future)
+            except JobCancelled:
+                raise ApiError(503, "Dönüşüm iptal edildi") from None
+            except OrderFileError as exc:
+                # Okunamayan veya bozuk çalışma kitabı; diğer hatalar sunucu hatasıdır (500)
+                raise ApiError(422, f"Dosya işlenemedi: {exc}") from None
+        else:
+            output, (rows, mismatches) = cached, summary
+    
+    download_name = export_file_name(original_filename, extension="xlsx" if extension == "xlsx" else "zip")
+    headers = {
+        # Türkçe karakterli dosya adları için RFC 5987 biçimi
+        "Content-Disposition": f"attachment; filename*=UTF-8''{quote(download_name)}",
+        "Content-Length": str(len(output)),
+        "X-Cache": cache_status,
+        "X-Elapsed-Seconds": f"{time.perf_counter() - started:.3f}",
+        "X-Rows": str(rows),
+    }
+    if mismatches is not None:
+        headers["X-Total-Mismatches"] = str(mismatches)
+    return StreamingResponse(_chunked(output), media_type=export_mime(extension), headers=headers)
+
+def _chunked(data):
+    view = memoryview(data)
+    for start in range(0, len(view), RESPONSE_CHUNK_BYTES):
+        yield view[start:start + RESPONSE_CHUNK_BYTES]
+
+async def health_endpoint(request):
+    state = request.app.state
+    return JSONResponse({
+        "status": "ok",
+        "formats": list(EXPORT_FORMATS.values()),
+        "conversion_cache_bytes": state.caches.conversion.total_bytes,
+        "export_cache_bytes": state.caches.export.total_bytes,
+        "store_master": state.reference_paths[0],
+        "price_list": state.reference_paths[1],
+    })
+
+async def _api_error(request, exc):
+    headers = {"Retry-After": "5"} if exc.status == 503 else None
+    return JSONResponse({"error": exc.message}, status_code=exc.status, headers=headers)
+
+async def _server_error(request, exc):
+    # Girdiden kaynaklanmayan beklenmeyen hatalar; istemci de JSON gövde alır
+    return JSONResponse({"error": f"Sunucu hatası: {type(exc).__name__}: {exc}"}, status_code=500)
+
+def create_app(pool=None, caches=None, max_concurrent=MAX_CONCURRENT_REQUESTS,
+               store_master=STORE_MASTER_PATH, price_list=PRICE_LIST_PATH):
+    """ASGI uygulamasını oluştur (uvicorn veya LocalClient ile çalıştırılır)"""
+    if caches is None:
+        disk = DiskCache(DISK_CACHE_DIR) if DISK_CACHE_DIR else None
+        caches = ApiCaches(
+            conversion=SharedCache(disk=disk), frame=ResultCache(max_entries=4, max_bytes=256 * 1024**2),
+            export=ResultCache(max_entries=16), summary=ResultCache(max_entries=256)
+        )
+    app = Starlette(
+        routes=[
+            Route("/convert", convert_endpoint, methods=["POST"]),
+            Route("/health", health_endpoint, methods=["GET"]),
+        ],
+        exception_handlers={ApiError: _api_error, Exception: _server_error},
+    )
+    app.state.pool = pool or JobPool()
+    app.state.caches = caches
+    app.state.slots = asyncio.Semaphore(max_concurrent)
+    app.state.reference_paths = (store_master, price_list)
+    return app
+
+# Yerel istemcinin döndürdüğü yanıt
+LocalResponse = namedtuple("LocalResponse", ["status", "headers", "body"])
+
+class LocalClient:
+    """Servisi ağ açmadan, ASGI arayüzü üzerinden süreç içinde çağıran istemci"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def request(self, method, path, params=None, body=b"", headers=()):
+        query = urlencode(params or {}).encode("ascii")
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+            "scheme": "http", "path": path, "raw_path": path.encode("ascii"), "query_string": query,
+            "root_path": "", "client": ("127.0.0.1", 0), "server": ("127.0.0.1", 80),
+            "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers],
+        }
+        messages = [{"type": "http.request", "body": body, "more_body": False}]
+        status, response_headers, chunks = None, {}, []
+        
+        async def receive():
+            if messages:
+                return messages.pop()
+            # Gövde bitti; yanıt gönderilene kadar bağlantı açık kalır
+            await asyncio.Event().wait()
+        
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers.update(
+                    (name.decode("latin-1"), value.decode("latin-1")) for name, value in message["headers"]
+                )
+            elif message["type"] == "http.response.body":
+                chunks.append(bytes(message.get("body", b"")))
+        
+        try:
+            await self.app(scope, receive, send)
+        except Exception:
+            # Starlette 500 yanıtını gönderdikten sonra hatayı sunucu kaydı için yeniden fırlatır
+            if status is None:
+                raise
+        return LocalResponse(status, response_headers, b"".join(chunks))
+    
+    async def convert(self, data, filename, extension="xlsx", threshold=None):
+        """Dosyayı /convert'e multipart olarak gönder"""
+        boundary = uuid.uuid4().hex
+        body = b"".join([
+            f"--{boundary}\r\n".encode("ascii"),
+            f'Content-Disposition: form-data; name="file"; filename="{filename.replace(chr(34), "_")}"\r\n'.encode("utf-8"),
+            b"Content-Type: application/octet-stream\r\n\r\n",
+            data,
+            f"\r\n--{boundary}--\r\n".encode("ascii"),
+        ])
+        params = {"format": extension}
+        if threshold is not None:
+            params["threshold"] = threshold
+        headers = [("content-type", f"multipart/form-data; boundary={boundary}"), ("content-length", str(len(body)))]
+        return await self.request("POST", "/convert", params, body, headers)
+
+async def _check(paths, extension, store_master=STORE_MASTER_PATH, price_list=PRICE_LIST_PATH):
+    """Dosyaları süreç içi istemciyle iki kez gönder ve sonuçları yazdır"""
+    client = LocalClient(create_app(store_master=store_master, price_list=price_list))
+    failures = 0
+    for path in paths:
+        with open(path, "rb") as handle:
+            data = handle.read()
+        for attempt in (1, 2):
+            started = time.perf_counter()
+            response = await client.convert(data, os.path.basename(path), extension)
+            elapsed = time.perf_counter() - started
+            if response.status != 200:
+                failures += 1
+                print(f"HATA  {os.path.basename(path)}: {response.status} {json.loads(response.body)['error']}")
+                break
+            print(
+                f"OK    {os.path.basename(path)} ({attempt}. istek): {len(response.body):,} bayt, "
+                f"önbellek {response.headers['x-cache']} ({elapsed:.2f} sn)"
+            )
+            if response.headers.get("x-total-mismatches", "0") != "0":
+                print(f"      {response.headers['x-total-mismatches']} üründe mağaza toplamı TOPLAM sütunuyla tutmuyor")
+    return 1 if failures else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sipariş dönüştürme HTTP servisi")
+    parser.add_argument("--host", default="127.0.0.1", help="Dinlenecek adres")
+    parser.add_argument("--port", type=int, default=8502, help="Dinlenecek port")
+    parser.add_argument("--check", nargs="+", metavar="XLSX", help="Sunucu açmadan dosyaları süreç içinde dönüştür")
+    parser.add_argument("--format", choices=sorted(set(EXPORT_FORMATS.values())), default="xlsx",
+                        help="--check için çıktı formatı")
+    parser.add_argument("--store-master", default=STORE_MASTER_PATH,
+                        help="Mağaza Kodu/Mağaza Adı sütunlu mağaza listesi (varsayılan: SIPARIS_STORE_MASTER)")
+    parser.add_argument("--price-list", default=PRICE_LIST_PATH,
+                        help="Kod/Birim Fiyat sütunlu fiyat listesi (varsayılan: SIPARIS_PRICE_LIST)")
+    args = parser.parse_args(argv)
+    
+    if args.check:
+        return asyncio.run(_check(args.check, args.format, args.store_master, args.price_list))
+    
+    import uvicorn
+    uvicorn.run(create_app(store_master=args.store_master, price_list=args.price_list), host=args.host, port=args.port)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
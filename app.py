@@ -1,9 +1,17 @@
+import os
 import streamlit as st
-import pandas as pd
-import re
+from collections import deque, namedtuple
+from functools import partial
 from io import BytesIO
 from datetime import datetime
 
+# Burada yalnızca hafif modüller yüklenir; pandas, numpy, openpyxl ve pyarrow
+# kullanan dönüştürme modülleri aşağıda, işlenecek bir dosya varken yüklenir
+from archive import ARCHIVE_AVAILABLE, ARCHIVE_DIR, list_conversions
+from defaults import DEFAULT_THRESHOLD, EXPORT_FORMATS, STORE_PATTERN
+from jobs import JobCancelled, JobPool, ProgressProfiler
+from profiling import NULL_PROFILER, StageProfiler
+
 # Sayfa yapılandırması
 st.set_page_config(
     page_title="Mağaza Sipariş Dönüştürücü", 
@@ -39,182 +47,579 @@ st.title("📊 Mağaza Sipariş Dönüştürücü")
 st.markdown("Müşteri Excel dosyalarını mağaza bazlı sipariş formatına dönüştürün")
 st.markdown("---")
 
-# Dosya yükleme alanı
-uploaded_file = st.file_uploader(
-    "Excel dosyası seçin",
-    type=["xlsx", "xls"],
-    help="Müşteriden aldığınız Excel dosyasını yükleyin"
+# Birleştirme modunda birden fazla dosya yüklenir ve toplamları birleştirilir
+consolidation_mode = st.toggle(
+    "📚 Çoklu dosya birleştirme",
+    key="consolidation_mode",
+    help="Birden fazla müşteri dosyasını dönüştürüp mağaza ve ürün toplamlarını tek çalışma kitabında birleştirir"
 )
 
-def clean_number(value):
-    """Değerleri temizle ve tam sayıya dönüştür"""
-    if pd.isnull(value):
-        return 0
+# Dosya yükleme alanı
+if consolidation_mode:
+    uploaded_files = st.file_uploader(
+        "Excel dosyalarını seçin",
+        type=["xlsx", "xls"],
+        accept_multiple_files=True,
+        help="Birleştirilecek müşteri dosyalarını yükleyin"
+    )
+    uploaded_file = None
+else:
+    uploaded_file = st.file_uploader(
+        "Excel dosyası seçin",
+        type=["xlsx", "xls"],
+        help="Müşteriden aldığınız Excel dosyasını yükleyin"
+    )
+
+# Bu boyuttan büyük dosyalar otomatik olarak düşük bellek modunda işlenir
+LOW_MEMORY_FILE_SIZE = 25 * 1024**2
+
+# Dışa aktarılan dosya adındaki tarih biçimleri
+DATE_FORMATS = {
+    "YYYYMMDD_HHMM": "%Y%m%d_%H%M",
+    "DD-MM-YYYY": "%d-%m-%Y",
+    "YYYY-MM-DD": "%Y-%m-%d",
+}
+
+# Geliştirici modunda tutulan aşama ölçümü sayısı ve isteğe bağlı kayıt dosyası
+PROFILE_HISTORY = 200
+PROFILE_LOG_PATH = "profile_log.jsonl"
+
+# Hoş geldin ekranındaki örnek girdi (tablo pandas'sız, düz markdown olarak çizilir)
+SAMPLE_INPUT_TABLE = """
+| Hmk Kod | Hmk Ürün Açıklama | 7684 M | 8373 M | 8105 MM | TOPLAM |
+|---|---|---:|---:|---:|---:|
+| 30.77.0111-1325 | ESL HS ÜÇGE R2004 (TİP1) | 75 | 0 | 0 | 75 |
+| 30.77.0111-1235 | ESL HS ÜÇGE R2004 (TİP2) | 0 | 0 | 500 | 500 |
+| 30.77.0111-990 | ESL HS GÖKÇELİK R2004 | 225 | 550 | 100 | 875 |
+"""
+
+# Arşiv listesi bu süre boyunca yeniden taranmaz (yeni kayıttan sonra hemen yenilenir)
+ARCHIVE_LIST_TTL = 60
+
+# Arka plandaki dönüşümün ilerlemesinin yoklanma aralığı (saniye)
+PROGRESS_POLL_INTERVAL = 0.5
+
+# Verilirse dönüşümler bu dizinde de saklanır ve uygulama yeniden başlatıldıktan sonra kullanılır
+DISK_CACHE_DIR = os.environ.get("SIPARIS_CACHE_DIR")
+
+# Büyük tablolarda sayfa başına gösterilen satır sayısı
+PAGE_SIZE = 50
+
+# Tablolardaki ürün açıklamalarının varsayılan uzunluk limiti (kenar çubuğundan değiştirilir)
+DESCRIPTION_LENGTH = 60
+
+SharedCaches = namedtuple("SharedCaches", ["conversion", "frame", "export", "lookup", "revision", "consolidation"])
+
+@st.cache_resource
+def conversion_pool():
+    """Tüm oturumların paylaştığı dönüşüm işçi havuzu"""
+    return JobPool()
+
+@st.cache_resource
+def shared_caches():
+    """Tüm oturumların paylaştığı önbellekler (aynı dosya süreç genelinde bir kez dönüştürülür)"""
+    disk = DiskCache(DISK_CACHE_DIR) if DISK_CACHE_DIR else None
+    return SharedCaches(
+        conversion=SharedCache(disk=disk),
+        # Okunan tablolar dosya özetiyle tutulur; eşik veya referans değişince Excel yeniden okunmaz
+        frame=ResultCache(max_entries=4, max_bytes=256 * 1024**2),
+        export=ResultCache(max_entries=16),
+        lookup=ResultCache(max_entries=16),
+        # Anlık görüntüler dönüşüm anahtarıyla tutulur; önceki sürüm eşlemesi oturumdadır
+        revision=ResultCache(max_entries=16),
+        consolidation=ResultCache(max_entries=4),
+    )
+
+@st.fragment(run_every=PROGRESS_POLL_INTERVAL)
+def show_job_progress(job, key):
+    """Arka plandaki işin ilerlemesini göster; iş bitince sayfayı yeniden çalıştır"""
+    if job.done():
+        st.rerun()
+    st.progress(job.fraction, text=f"⏳ {job.message}... ({job.elapsed:.0f} sn)")
+    if st.button("⏹️ İşlemi İptal Et", key=f"cancel_{id(job)}"):
+        # Aynı dosyayı bekleyen başka oturum varsa dönüşüm onlar için sürer
+        job.cancel()
+        st.session_state.background_jobs[key] = None
+        st.rerun()
+
+def run_in_background(key, name, fn, *args, **kwargs):
+    """fn(job, ...) çağrısını işçi havuzunda çalıştır; bitmişse sonucunu döndür
     
-    # Excel'den gelen sayısal değerler
-    if isinstance(value, (int, float)):
-        return int(value) if value >= 10 else 0
+    İş sürüyorsa ilerleme ve iptal düğmesi gösterilir, iptal edildiyse yeniden
+    başlatma düğmesi; işçide hata oluştuysa hata mesajı ve yeniden deneme
+    düğmesi. Bu durumların hepsinde None döner. Başka bir oturum aynı
+    anahtarla iş başlatmışsa yenisi başlatılmaz, o iş beklenir. Oturumda aynı anda
+    tek iş tutulur, başka bir dosya için başlatılan iş öncekini bırakır.
+    """
+    jobs = st.session_state.setdefault("background_jobs", {})
+    for other in [other for other in jobs if other != key]:
+        other_job = jobs.pop(other)
+        if other_job is not None:
+            other_job.cancel()
     
-    # Metin değerleri
-    value_str = str(value).strip()
-    if value_str in ['', '-', 'NaN', 'nan']:
-        return 0
+    if key not in jobs:
+        jobs[key] = conversion_pool().submit_shared(key, name, fn, *args, **kwargs)
+    job = jobs[key]
+    if job is None:
+        # Bu oturum iptal etti
+        st.warning(f"⏹️ {name} için işlem iptal edildi.")
+        if st.button("🔄 Yeniden Başlat"):
+            del jobs[key]
+            st.rerun()
+        return None
+    if not job.done():
+        show_job_progress(job, key)
+        return None
     
     try:
-        value_str = value_str.replace(' ', '').replace(',', '.')
-        result = float(value_str)
-        return int(result) if result >= 10 else 0
-    except:
-        return 0
-
-def find_store_columns(df):
-    """Mağaza sütunlarını dinamik olarak bul"""
-    # Çok daha esnek pattern: 3-4 haneli sayı + opsiyonel harf kombinasyonu (büyük/küçük)
-    # Bu pattern gelecekte yeni store tipleri eklendiğinde de çalışacak
-    store_pattern = re.compile(r'^\d{3,4}\s*[A-Za-z]*$')
-    
-    store_cols = []
-    store_start_idx = None
-    store_end_idx = None
-    
-    # Bilinen store tiplerini logla (debug için)
-    found_store_types = set()
-    
-    for idx, col in enumerate(df.columns):
-        col_str = str(col).strip()
-        if store_pattern.match(col_str):
-            if store_start_idx is None:
-                store_start_idx = idx
-            store_cols.append(col)
-            
-            # Store tipini çıkar ve logla (büyük harfe çevir)
-            match = re.search(r'^\d{3,4}\s*([A-Za-z]*)$', col_str)
-            if match:
-                store_type = match.group(1).upper() if match.group(1) else "NO_SUFFIX"
-                found_store_types.add(store_type)
-                
-        elif col == "TOPLAM" and store_start_idx is not None:
-            store_end_idx = idx
-            break
+        result = job.result()
+    except JobCancelled:
+        del jobs[key]
+        return None
+    except Exception as exc:
+        # Başarısız iş oturumda kalır; sonraki çalıştırmalar dosyayı yeniden okumaz
+        message = str(exc) if isinstance(exc, OrderFileError) else f"{type(exc).__name__}: {exc}"
+        st.error(f"❌ {name} dönüştürülemedi: {message}")
+        if st.button("🔄 Yeniden Dene"):
+            del jobs[key]
+            st.rerun()
+        return None
+    del jobs[key]
+    return result
+
+def convert_upload(job, cache, key, data, original_filename, threshold, store_pattern, profiler, snapshots, archive_dir,
+                   reference, frames=None):
+    """İşçide çalışır: dosyayı dönüştür, önbelleğe ve istenirse arşive yaz (Streamlit çağrısı yapmaz)
+    
+    ((dönüşüm, TOPLAM mutabakatı), arşiv hatası) döndürür. Sonuç işçide
+    önbelleğe yazılır; iş biter bitmez gelen oturumlar da onu bulur. Önceki
+    sürüme göre farklar oturuma özgüdür, önbelleğe yazılmaz (bkz. session_revision_diff).
+    """
+    conversion, _, reconciliation = convert_checked(
+        BytesIO(data), original_filename, threshold, store_pattern, snapshots, reference, ProgressProfiler(job, profiler),
+        frames, key[0]
+    )
+    cached = (conversion, reconciliation)
+    cache.put(key, cached, conversion_nbytes(conversion))
+    
+    archive_error = None
+    if archive_dir and conversion[2] is not None:
+        job.report(0.95, "Arşive yazılıyor")
+        try:
+            save_conversion(conversion[2], original_filename, key[0], threshold, archive_dir)
+        except OSError as exc:
+            archive_error = exc
+    return cached, archive_error
+
+def stream_upload(job, cache, key, data, original_filename, threshold, store_pattern, profiler, reference):
+    """İşçide çalışır: dosyayı düşük bellek modunda dönüştür, (dönüşüm, Excel baytları) döndür"""
+    output = BytesIO()
+    conversion = stream_convert_file(
+        BytesIO(data), output, original_filename, threshold, store_pattern,
+        profiler=ProgressProfiler(job, profiler), reference=reference
+    )
+    cached = (conversion, output.getvalue())
+    cache.put(key, cached, len(cached[1]))
+    return cached
+
+def session_revision_diff(key, store_cols, threshold, snapshots):
+    """Bu oturumda aynı başlıkla yüklenen önceki dosyaya göre farklar (yoksa None)
+    
+    Farklar yüklenen dosya değiştiğinde bir kez hesaplanıp oturumda tutulur;
+    başka oturumların yüklemeleri hiçbir zaman önceki sürüm sayılmaz.
+    """
+    latest = st.session_state.setdefault("revision_latest", {})
+    diffs = st.session_state.setdefault("revision_diffs", {})
+    header_key = snapshot_key(store_cols, threshold)
+    previous_key = latest.get(header_key)
+    if previous_key != key:
+        previous = None if previous_key is None else snapshots.get(previous_key)
+        snapshot = snapshots.get(key)
+        diffs[header_key] = revision_diff(previous, snapshot) if previous is not None and snapshot is not None else None
+        latest[header_key] = key
+    return diffs.get(header_key)
+
+def process_file(file_buffer, original_filename, cache, threshold=DEFAULT_THRESHOLD, store_pattern=STORE_PATTERN, cache_key=None, profiler=NULL_PROFILER, snapshots=None, archive_dir=None, reference=None, frames=None):
+    """Excel dosyasını işle ve yeni formata dönüştür (dönüşüm sürüyorsa None döner)
+    
+    snapshots (paylaşılan anlık görüntü önbelleği) verilirse bu oturumda aynı
+    başlıkla yüklenen önceki dosyanın değişmeyen satırları yeniden kullanılır ve
+    ona göre farklar gösterilir. archive_dir
+    verilirse yeni dönüşümler yerel arşive de yazılır. reference verilirse
+    sonuca mağaza adları ve fiyatlar eklenir; TOPLAM sütunuyla tutmayan ürünler
+    her durumda gösterilir. frames verilirse okunan tablo dosya özetiyle saklanır;
+    aynı dosya başka bir eşik veya referansla dönüştürülürken yeniden okunmaz.
+    """
+    reference = reference or NO_REFERENCE
+    key = cache_key or ResultCache.make_key(file_buffer.getvalue(), original_filename, threshold, store_pattern, reference.signature)
+    # Bu oturumun başlattığı iş varsa sonuç (ve uyarılar) iş tutamacından alınır
+    cached = None if key in st.session_state.get("background_jobs", {}) else cache.get(key)
+    if cached is None:
+        # Dönüşüm arka planda çalışır; bitene kadar ilerleme gösterilir
+        source_snapshots = None
+        if snapshots is not None:
+            source_snapshots = SourceSnapshots(snapshots, st.session_state.setdefault("revision_latest", {}), key)
+        finished = run_in_background(
+            key, original_filename, convert_upload, cache, key, file_buffer.getvalue(), original_filename,
+            threshold, store_pattern, profiler, source_snapshots, archive_dir, reference, frames
+        )
+        if finished is None:
+            return None
+        cached, archive_error = finished
+        if archive_error is not None:
+            st.warning(f"Dönüşüm arşive yazılamadı: {archive_error}")
+        elif archive_dir:
+            archived_conversions.clear()
+    
+    (store_cols, column_preview, result), reconciliation = cached
+    if not show_store_columns(store_cols, column_preview):
+        return None, None, None, None, None
+    diff = session_revision_diff(key, store_cols, threshold, snapshots) if snapshots is not None else None
+    if diff is not None:
+        show_revision_diff(diff)
+    if reconciliation is not None:
+        show_reconciliation(reconciliation)
+    return result
+
+def process_file_streaming(file_buffer, original_filename, cache, threshold=DEFAULT_THRESHOLD, store_pattern=STORE_PATTERN, cache_key=None, profiler=NULL_PROFILER, reference=None):
+    """Dosyayı sonuç tablosunu bellekte tutmadan dönüştür, özet ve Excel çıktısını döndür"""
+    reference = reference or NO_REFERENCE
+    key = ("stream", cache_key or ResultCache.make_key(file_buffer.getvalue(), original_filename, threshold, store_pattern, reference.signature))
+    # Bu oturumun başlattığı iş varsa sonuç (ve uyarılar) iş tutamacından alınır
+    cached = None if key in st.session_state.get("background_jobs", {}) else cache.get(key)
+    if cached is None:
+        cached = run_in_background(
+            key, original_filename, stream_upload, cache, key, file_buffer.getvalue(), original_filename,
+            threshold, store_pattern, profiler, reference
+        )
+        if cached is None:
+            return None
+    
+    (store_cols, column_preview, summary), export_bytes = cached
+    if not show_store_columns(store_cols, column_preview):
+        return None
+    return summary, export_bytes
+
+def open_archived_conversion(path, cache):
+    """Arşivdeki dönüşümü aç; (orijinal dosya adı, sonuç) döndür"""
+    key = ("archive", path)
+    loaded = cache.get(key)
+    if loaded is None:
+        loaded = load_conversion(path)
+        cache.put(key, loaded, conversion_nbytes((None, None, loaded[1])))
+    return loaded
+
+@st.cache_data(ttl=ARCHIVE_LIST_TTL, show_spinner=False)
+def archived_conversions(root, limit=50):
+    """Kenar çubuğu için arşivdeki son dönüşümler (dizin her çalıştırmada taranmaz)"""
+    return list_conversions(root)[:limit]
+
+def truncate_text(values, limit):
+    """Metinleri vektörel olarak kısalt; sınırı aşanların sonuna "..." ekle"""
+    text = values.astype(str)
+    shortened = text.str.slice(0, limit)
+    return shortened.where(text.str.len() <= limit, shortened + "...")
+
+def description_columns(frame, column):
+    """Kenar çubuğu ayarına göre açıklama sütununu kısalt ya da tablodan çıkar"""
+    if not st.session_state.get("show_descriptions", True):
+        return frame.drop(columns=column)
+    frame[column] = truncate_text(frame[column], st.session_state.get("description_length", DESCRIPTION_LENGTH))
+    return frame
+
+def format_thousands(values):
+    """Miktarları binlik ayraçlı metne çevir (yalnızca görünen sayfa için)"""
+    return values.map("{:,}".format)
+
+def page_slice(row_count, key, page_size=PAGE_SIZE):
+    """Sayfa seçicisini göster ve görünen satır aralığını döndür
+    
+    Tablonun yalnızca bu aralığı biçimlendirilip tarayıcıya gönderilir.
+    """
+    pages = max(1, -(-row_count // page_size))
+    page = 1
+    if pages > 1:
+        page = st.number_input(f"Sayfa (1-{pages}):", min_value=1, max_value=pages, value=1, key=key)
+    start = (page - 1) * page_size
+    stop = min(start + page_size, row_count)
+    st.caption(f"{start + 1:,}-{stop:,} / {row_count:,} satır")
+    return slice(start, stop)
+
+def show_store_columns(store_cols, column_preview):
+    """Bulunan mağaza sütunlarını göster; sütun yoksa hata ver"""
+    if not store_cols:
+        st.error("❌ Mağaza sütunları bulunamadı. Dosya formatı: Mağaza kodları (örn: 798 MM, 5776 M) ve TOPLAM sütunu olmalı.")
+        # Debug bilgisi göster
+        st.write("Bulunan sütunlar:", column_preview)
+        return False
     
     # Debug bilgisi göster
-    if store_cols:
-        st.info(f"🔍 Bulunan store tipleri: {', '.join(sorted(found_store_types))}")
+    st.info(f"🔍 Bulunan store tipleri: {', '.join(find_store_types(store_cols))}")
+    st.success(f"✅ {len(store_cols)} mağaza sütunu bulundu")
+    
+    # Debug: Bulunan store sütunlarını göster
+    with st.expander("🔍 Bulunan Store Sütunları (Debug)"):
+        store_debug_df = pd.DataFrame({
+            'Sütun Adı': [str(col.column) for col in store_cols],
+            'Store Kodu': [col.code or 'N/A' for col in store_cols],
+            'Store Tipi': [col.store_type or 'NO_SUFFIX' for col in store_cols],
+            'Sütun No': [col.position + 1 for col in store_cols]
+        })
+        st.dataframe(store_debug_df, use_container_width=True, hide_index=True)
     
-    return store_cols, store_start_idx, store_end_idx
+    return True
 
-def process_file(file_buffer, original_filename):
-    """Excel dosyasını işle ve yeni formata dönüştür"""
-    with st.spinner('Dosyanız işleniyor...'):
-        # Excel'i oku
-        df = pd.read_excel(file_buffer, engine='openpyxl')
-        
-        # Mağaza sütunlarını dinamik olarak bul
-        store_cols, store_start_idx, store_end_idx = find_store_columns(df)
-        
-        if not store_cols:
-            st.error("❌ Mağaza sütunları bulunamadı. Dosya formatı: Mağaza kodları (örn: 798 MM, 5776 M) ve TOPLAM sütunu olmalı.")
-            # Debug bilgisi göster
-            st.write("Bulunan sütunlar:", list(df.columns[:20]))
-            return None, None, None, None, None
-        
-        st.success(f"✅ {len(store_cols)} mağaza sütunu bulundu")
-        
-        # Debug: Bulunan store sütunlarını göster
-        with st.expander("🔍 Bulunan Store Sütunları (Debug)"):
-            store_debug_df = pd.DataFrame({
-                'Sütun Adı': store_cols,
-                'Store Kodu': [re.search(r'^(\d{3,4})', str(col)).group(1) if re.search(r'^(\d{3,4})', str(col)) else 'N/A' for col in store_cols],
-                'Store Tipi': [re.search(r'^\d{3,4}\s*([A-Za-z]*)$', str(col)).group(1).upper() if re.search(r'^\d{3,4}\s*([A-Za-z]*)$', str(col)) and re.search(r'^\d{3,4}\s*([A-Za-z]*)$', str(col)).group(1) else 'NO_SUFFIX' for col in store_cols]
-            })
-            st.dataframe(store_debug_df, use_container_width=True, hide_index=True)
-        
-        # Çıktı hazırla
-        output_df = pd.DataFrame(columns=[
-            "Mağaza Kodu", "Tarih", "Mağaza Kodu2", "Mağaza Adı", "Artikel",
-            "Kod", "MALZEME TANIMI", "Adet", "Birim Fiyat", "TOPLAM TUTAR(TL)", "İlgili"
-        ])
-        
-        magaza_kodu = original_filename.rsplit('.', 1)[0]
-        store_totals = {}
-        product_totals = {}  # Ürün bazlı toplamlar
-        product_descriptions = {}  # Ürün açıklamaları
-        product_count = 0
-        
-        # İlerleme çubuğu
-        progress_bar = st.progress(0)
-        total_rows = len(df)
-        
-        for idx, row in df.iterrows():
-            # İlerleme durumunu güncelle
-            progress_bar.progress((idx + 1) / total_rows)
-            
-            # Boş ürün kodlarını atla
-            kod = row.get("Hmk Kod", None)
-            if pd.isnull(kod) or str(kod).strip() == '':
-                continue
-            
-            # Ürün açıklamasını al
-            description = row.get("Hmk Ürün Açıklama", "")
-            if not pd.isnull(description):
-                product_descriptions[str(kod)] = str(description)
-            
-            product_count += 1
-            
-            # Her mağazayı işle
-            for store_col in store_cols:
-                value = clean_number(row[store_col])
-                
-                if value > 0:
-                    # Çok daha esnek store kodu çıkarma - herhangi bir harf kombinasyonunu kaldır (büyük/küçük)
-                    match = re.search(r'^(\d{3,4})\s*[A-Za-z]*$', str(store_col))
-                    if match:
-                        magaza_kodu2 = match.group(1)
-                        
-                        # Toplamları takip et
-                        store_totals[magaza_kodu2] = store_totals.get(magaza_kodu2, 0) + value
-                        
-                        # Ürün bazlı toplamları takip et
-                        if str(kod) not in product_totals:
-                            product_totals[str(kod)] = 0
-                        product_totals[str(kod)] += value
-                        
-                        # Satır ekle - MALZEME TANIMI'na açıklama ekle
-                        output_df.loc[len(output_df)] = [
-                            magaza_kodu,     # Mağaza Kodu
-                            "",              # Tarih
-                            magaza_kodu2,    # Mağaza Kodu2
-                            "",              # Mağaza Adı
-                            "",              # Artikel
-                            str(kod),        # Kod
-                            str(description) if not pd.isnull(description) else "",  # MALZEME TANIMI
-                            value,           # Adet
-                            "",              # Birim Fiyat
-                            "",              # TOPLAM TUTAR
-                            ""               # İlgili
-                        ]
-        
-        progress_bar.empty()
+def show_revision_diff(diff):
+    """Aynı başlıklı önceki dosyaya göre değişen satırları ve miktarları göster"""
+    if not (diff.added or diff.removed or diff.changed):
+        return
+    
+    with st.expander(f"🔁 Önceki Sürüme Göre Değişiklikler ({diff.source})", expanded=True):
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Değişen Satır", f"{diff.changed:,}")
+        with col2:
+            st.metric("Eklenen Satır", f"{diff.added:,}")
+        with col3:
+            st.metric("Silinen Satır", f"{diff.removed:,}")
+        with col4:
+            st.metric("Aynı Kalan Satır", f"{diff.unchanged:,}")
         
-    return output_df, store_totals, product_count, len(store_cols), (product_totals, product_descriptions)
+        if diff.changes.empty:
+            st.write("Sipariş miktarlarında değişiklik yok.")
+        else:
+            store_changes = diff.changes.groupby('Mağaza Kodu2', sort=False, observed=True)['Fark'].sum()
+            st.write(f"{len(diff.changes):,} mağaza/ürün miktarı değişti, {len(store_changes):,} mağaza etkilendi.")
+            st.dataframe(
+                diff.changes.sort_values('Fark', key=abs, ascending=False),
+                use_container_width=True,
+                hide_index=True
+            )
 
-# Ana işlem
-if uploaded_file:
-    # Dosya bilgileri
-    col1, col2, col3 = st.columns(3)
+def show_reconciliation(reconciliation):
+    """Mağaza toplamı TOPLAM sütunuyla tutmayan ürünleri göster"""
+    mismatches = reconciliation.mismatches
+    if mismatches.empty:
+        st.caption(f"✔️ {reconciliation.checked:,} ürünün mağaza toplamı TOPLAM sütunuyla tutuyor.")
+        return
+    
+    with st.expander(f"⚠️ TOPLAM Sütunuyla Tutmayan Ürünler ({len(mismatches):,} / {reconciliation.checked:,})", expanded=True):
+        st.caption("Mağaza toplamı, mağaza sütunlarındaki değerlerin eşik, ondalık kırpma ve negatif sıfırlama uygulanmadan satır toplamıdır.")
+        mismatches = mismatches.sort_values('Fark', key=abs, ascending=False)
+        st.dataframe(
+            mismatches.iloc[page_slice(len(mismatches), key="mismatch_page")],
+            use_container_width=True,
+            hide_index=True
+        )
+
+def show_consolidation(files, threshold=DEFAULT_THRESHOLD):
+    """Yüklenen dosyaları paralel dönüştür, birleştirilmiş toplamları göster ve indir"""
+    key = tuple(ResultCache.make_key(file.getvalue(), file.name, threshold, STORE_PATTERN) for file in files)
+    cached = caches.consolidation.get(key)
+    if cached is None:
+        with st.spinner(f'{len(files)} dosya dönüştürülüp birleştiriliyor...'):
+            consolidation = consolidate_files([(BytesIO(file.getvalue()), file.name) for file in files], threshold)
+            files_df = files_frame(consolidation)
+            summary = build_summary(
+                consolidation.store_totals, consolidation.product_totals, consolidation.product_descriptions
+            )
+            export_bytes = build_consolidated_export(consolidation, files_df, summary)
+        cached = (consolidation, files_df, export_bytes, summary)
+        caches.consolidation.put(
+            key, cached, int(consolidation.pair_totals.memory_usage(deep=True).sum()) + len(export_bytes)
+        )
+    consolidation, files_df, export_bytes, summary = cached
+    
+    failed = files_df[files_df["Hata"] != ""]
+    for _, row in failed.iterrows():
+        st.error(f"❌ {row['Dosya']}: {row['Hata']}")
+    if consolidation.pair_totals.empty:
+        return
+    st.success(f"✅ {len(files_df) - len(failed)}/{len(files_df)} dosya birleştirildi!")
+    
+    st.markdown("### 📈 Birleştirilmiş Özet")
+    col1, col2, col3, col4 = st.columns(4)
     with col1:
-        st.metric("Dosya Adı", uploaded_file.name)
+        st.metric("Dosya", f"{len(files_df) - len(failed):,}")
     with col2:
-        st.metric("Dosya Boyutu", f"{uploaded_file.size / 1024:.1f} KB")
+        st.metric("Toplam Mağaza", f"{len(consolidation.store_totals):,}")
     with col3:
-        st.metric("Yükleme Zamanı", datetime.now().strftime("%H:%M:%S"))
+        st.metric("Toplam Ürün", f"{len(consolidation.product_totals):,}")
+    with col4:
+        st.metric("Toplam Miktar", f"{summary.stores.total():,}")
+    
+    st.dataframe(files_df, use_container_width=True, hide_index=True)
+    
+    st.markdown("### 🏪 Miktar Bazında İlk 10 Mağaza")
+    store_summary = store_table(summary, summary.stores.top(10))
+    store_summary['Toplam Miktar'] = format_thousands(store_summary['Toplam Miktar'])
+    st.dataframe(store_summary, use_container_width=True, hide_index=True)
+    
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col2:
+        st.download_button(
+            label="📥 Birleştirilmiş Excel'i İndir",
+            data=export_bytes,
+            file_name=f"birlestirilmis_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+
+# Dosya yüklenmemişken kenar çubuğundan arşivdeki bir dönüşüm açılabilir
+archived_path = None if uploaded_file or consolidation_mode else st.session_state.get("archived_conversion")
+if archived_path and not os.path.exists(archived_path):
+    # Arşiv sınırı nedeniyle silinmiş (liste ARCHIVE_LIST_TTL boyunca önbellekte kalır)
+    st.warning("Seçilen dönüşüm arşivden silinmiş.")
+    archived_conversions.clear()
+    archived_path = None
+
+# Dönüştürme hattı yalnızca işlenecek bir dosya (veya geliştirici modu) varken
+# yüklenir; dosya yokken hoş geldin ekranı ve kenar çubuğu bu modüller olmadan
+# çizilir. Modüller süreç başına bir kez yüklenir, sonraki çalıştırmalar
+# sys.modules'tan alır.
+if (uploaded_files if consolidation_mode else uploaded_file) or archived_path or st.session_state.get("dev_mode"):
+    import pandas as pd
+    from archive import load_conversion, save_conversion
+    from converter import (
+        OrderFileError, ResultCache, build_lookup_index, conversion_nbytes, find_store_types, output_frame
+    )
+    from consolidate import consolidate_files, files_frame
+    from enrichment import NO_REFERENCE, convert_checked, load_reference_data
+    from incremental import SourceSnapshots, revision_diff, snapshot_key
+    from exporter import (
+        build_consolidated_export, cached_export, export_file_name, export_mime, prepare_split_export, split_export_files
+    )
+    from search import ProductSearchIndex
+    from shared_cache import DiskCache, SharedCache
+    from streaming import stream_convert_file
+    from summary import build_summary, product_table, store_table, summary_nbytes
+    
+    caches = shared_caches()
+    
+    # Mağaza listesi ve fiyat listesi (SIPARIS_STORE_MASTER / SIPARIS_PRICE_LIST)
+    # dosyalar değişmedikçe süreç başına bir kez okunur
+    try:
+        reference = load_reference_data()
+    except (OSError, ValueError) as exc:
+        st.warning(f"Referans dosyası okunamadı, mağaza adları ve fiyatlar eklenmeyecek: {exc}")
+        reference = NO_REFERENCE
+
+if consolidation_mode:
+    if uploaded_files:
+        show_consolidation(uploaded_files, st.session_state.get("min_quantity", DEFAULT_THRESHOLD))
+    else:
+        st.info("📚 Birleştirmek istediğiniz müşteri dosyalarını yükleyin.")
+
+# Ana işlem
+if uploaded_file or archived_path:
+    if "profile_log" not in st.session_state:
+        st.session_state.profile_log = deque(maxlen=PROFILE_HISTORY)
     
-    # Dosyayı işle
-    result = process_file(uploaded_file, uploaded_file.name)
+    if uploaded_file:
+        # Dosya bilgileri
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Dosya Adı", uploaded_file.name)
+        with col2:
+            st.metric("Dosya Boyutu", f"{uploaded_file.size / 1024:.1f} KB")
+        with col3:
+            st.metric("Yükleme Zamanı", datetime.now().strftime("%H:%M:%S"))
+        
+        threshold = st.session_state.get("min_quantity", DEFAULT_THRESHOLD)
+        conversion_key = ResultCache.make_key(
+            uploaded_file.getvalue(), uploaded_file.name, threshold, STORE_PATTERN, reference.signature
+        )
+        low_memory = st.session_state.get("low_memory_mode", False) or uploaded_file.size >= LOW_MEMORY_FILE_SIZE
+        
+        # Aşama ölçümleri her zaman toplanır; bellek ölçümü ve dosyaya yazma geliştirici modundan açılır
+        profiler = StageProfiler(
+            run=f"{uploaded_file.name} #{conversion_key[0][:8]}",
+            trace_memory=st.session_state.get("profile_memory", False),
+            sink=st.session_state.profile_log,
+            log_path=PROFILE_LOG_PATH if st.session_state.get("profile_to_log", False) else None
+        )
+        source_name = uploaded_file.name
+    else:
+        # Arşivden açılan dönüşüm: Excel okunmaz, sonuç bellek eşlemeli yüklenir
+        source_name, archived_result = open_archived_conversion(archived_path, caches.conversion)
+        conversion_key = ("archive", archived_path)
+        low_memory = False
+        profiler = NULL_PROFILER
+    
+    pending = False
+    if low_memory:
+        # Büyük dosyalar: sonuç tablosu tutulmaz, çıktı parça parça yazılır
+        result = (None, None, None, None, None)
+        streamed = process_file_streaming(
+            uploaded_file,
+            uploaded_file.name,
+            threshold=threshold,
+            cache=caches.conversion,
+            cache_key=conversion_key,
+            profiler=profiler,
+            reference=reference
+        )
+        if streamed is not None:
+            (row_count, stream_store_totals, stream_product_count, _, _), export_bytes = streamed
+            st.success("✅ Dosya düşük bellek modunda işlendi!")
+            st.info("💡 Büyük dosyalarda bellek tasarrufu için önizleme ve sorgulama panelleri gösterilmez.")
+            
+            st.markdown("### 📈 İşlem Özeti")
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Toplam Mağaza", f"{len(stream_store_totals):,}")
+            with col2:
+                st.metric("Toplam Ürün", f"{stream_product_count:,}")
+            with col3:
+                st.metric("Toplam Miktar", f"{sum(stream_store_totals.values()):,}")
+            with col4:
+                st.metric("Çıktı Satırı", f"{row_count:,}")
+            
+            st.markdown("### 💾 Dönüştürülmüş Dosyayı İndir")
+            col1, col2, col3 = st.columns([1, 2, 1])
+            with col2:
+                st.download_button(
+                    label="📥 Dönüştürülmüş Excel'i İndir",
+                    data=export_bytes,
+                    file_name=export_file_name(uploaded_file.name),
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                )
+    elif uploaded_file:
+        # Dosyayı işle
+        result = process_file(
+            uploaded_file,
+            uploaded_file.name,
+            threshold=threshold,
+            cache=caches.conversion,
+            cache_key=conversion_key,
+            profiler=profiler,
+            snapshots=caches.revision,
+            archive_dir=ARCHIVE_DIR if ARCHIVE_AVAILABLE else None,
+            reference=reference,
+            frames=caches.frame
+        )
+        # Dönüşüm arka planda sürüyor; ilerleme yukarıda gösteriliyor
+        pending = result is None
+        if pending:
+            result = (None, None, None, None, None)
+    else:
+        result = archived_result
+        st.info(f"🗂️ Arşivden açıldı: {source_name}")
     
     if result[0] is not None:
         result_df, store_totals, product_count, store_count, (product_totals, product_descriptions) = result
         
+        # Mağaza/ürün sorguları tüm tabloyu taramasın diye dönüşüm başına bir kez indekslenir
+        lookup_index = caches.lookup.get(conversion_key)
+        if lookup_index is None:
+            lookup_index = build_lookup_index(result_df)
+            caches.lookup.put(conversion_key, lookup_index, sum(index.nbytes for index in lookup_index))
+        
+        # Sıralı mağaza/ürün toplamları panellerde ve dışa aktarmada ortak kullanılır
+        summary = caches.lookup.get(("summary", conversion_key))
+        if summary is None:
+            summary = build_summary(store_totals, product_totals, product_descriptions)
+            caches.lookup.put(("summary", conversion_key), summary, summary_nbytes(summary))
+        
         if not result_df.empty:
             st.success("✅ Dosya başarıyla işlendi!")
             
@@ -231,20 +636,20 @@ if uploaded_file:
             with col4:
                 st.metric("Çıktı Satırı", f"{len(result_df):,}")
             
+            # Fiyat listesi verildiyse tutar sütun bazında hesaplanmıştır
+            if "TOPLAM TUTAR(TL)" in result_df:
+                amounts = result_df["TOPLAM TUTAR(TL)"]
+                st.caption(f"💰 Toplam tutar: {amounts.sum():,.2f} TL · fiyatı bulunamayan satır: {int(amounts.isna().sum()):,}")
+            
             # İki sütunlu layout
             col_left, col_right = st.columns(2)
             
             with col_left:
                 # Mağaza özeti
                 st.markdown("### 🏪 Miktar Bazında İlk 10 Mağaza")
-                store_summary = pd.DataFrame(
-                    [(k, v) for k, v in store_totals.items()],
-                    columns=['Mağaza Kodu', 'Toplam Miktar']
-                ).sort_values('Toplam Miktar', ascending=False)
-                
-                top_stores = store_summary.head(10).copy()
+                top_stores = store_table(summary, summary.stores.top(10))
                 top_stores['Sıra'] = range(1, len(top_stores) + 1)
-                top_stores['Toplam Miktar'] = top_stores['Toplam Miktar'].apply(lambda x: f"{x:,}")
+                top_stores['Toplam Miktar'] = format_thousands(top_stores['Toplam Miktar'])
                 top_stores = top_stores[['Sıra', 'Mağaza Kodu', 'Toplam Miktar']]
                 
                 st.dataframe(
@@ -257,19 +662,11 @@ if uploaded_file:
             with col_right:
                 # En çok sipariş edilen ürünler
                 st.markdown("### 📦 En Çok Sipariş Edilen İlk 10 Ürün")
-                product_summary = []
-                for kod, miktar in product_totals.items():
-                    aciklama = product_descriptions.get(kod, "Açıklama yok")
-                    product_summary.append({
-                        'Ürün Kodu': kod,
-                        'Açıklama': aciklama[:50] + "..." if len(aciklama) > 50 else aciklama,
-                        'Toplam Miktar': miktar
-                    })
-                
-                product_df = pd.DataFrame(product_summary).sort_values('Toplam Miktar', ascending=False).head(10)
+                product_df = product_table(summary, summary.products.top(10), missing="Açıklama yok")
+                product_df = product_df.rename(columns={'Ürün Açıklama': 'Açıklama'})
                 product_df['Sıra'] = range(1, len(product_df) + 1)
-                product_df['Toplam Miktar'] = product_df['Toplam Miktar'].apply(lambda x: f"{x:,}")
-                product_df = product_df[['Sıra', 'Ürün Kodu', 'Açıklama', 'Toplam Miktar']]
+                product_df['Toplam Miktar'] = format_thousands(product_df['Toplam Miktar'])
+                product_df = description_columns(product_df[['Sıra', 'Ürün Kodu', 'Açıklama', 'Toplam Miktar']], 'Açıklama')
                 
                 st.dataframe(
                     product_df,
@@ -289,14 +686,12 @@ if uploaded_file:
                     with col2:
                         st.info(f"**Mağaza {search_store}**: {store_totals[search_store]:,} adet")
                     
-                    # Bu mağaza için ürünleri göster
-                    store_products = result_df[result_df['Mağaza Kodu2'] == search_store][['Kod', 'MALZEME TANIMI', 'Adet']]
-                    if st.checkbox(f"Mağaza {search_store} için tüm {len(store_products)} ürünü göster"):
-                        # Ürün açıklamalarını kısalt
-                        store_products_display = store_products.copy()
-                        store_products_display['MALZEME TANIMI'] = store_products_display['MALZEME TANIMI'].apply(
-                            lambda x: x[:60] + "..." if len(x) > 60 else x
-                        )
+                    # Bu mağaza için ürünleri göster (yalnızca görünen sayfa tablodan alınır)
+                    store_rows = lookup_index.stores.rows(search_store)
+                    if st.checkbox(f"Mağaza {search_store} için tüm {len(store_rows)} ürünü göster"):
+                        visible = page_slice(len(store_rows), key=f"store_page_{search_store}")
+                        store_products_display = result_df.iloc[store_rows[visible]][['Kod', 'MALZEME TANIMI', 'Adet']]
+                        store_products_display = description_columns(store_products_display, 'MALZEME TANIMI')
                         st.dataframe(store_products_display, use_container_width=True, hide_index=True)
                 else:
                     with col2:
@@ -305,53 +700,60 @@ if uploaded_file:
             # Dışa aktarma bölümü
             st.markdown("### 💾 Dönüştürülmüş Dosyayı İndir")
             
-            # Excel dosyasını hazırla
-            output = BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                # Ana veriyi yaz
-                result_df.to_excel(writer, index=False, sheet_name="Siparişler")
-                
-                # Özet sayfası ekle
-                summary_data = {
-                    'Metrik': ['Toplam Mağaza', 'Toplam Ürün', 'Toplam Miktar', 'İşlem Tarihi'],
-                    'Değer': [len(store_totals), product_count, sum(store_totals.values()), 
-                             datetime.now().strftime("%d.%m.%Y %H:%M")]
-                }
-                pd.DataFrame(summary_data).to_excel(writer, index=False, sheet_name="Özet")
-                
-                # Mağaza toplamları sayfası ekle
-                store_summary.to_excel(writer, index=False, sheet_name="Mağaza Toplamları")
-                
-                # Ürün toplamları sayfası ekle
-                product_export = []
-                for kod, miktar in sorted(product_totals.items(), key=lambda x: x[1], reverse=True):
-                    product_export.append({
-                        'Ürün Kodu': kod,
-                        'Ürün Açıklama': product_descriptions.get(kod, ""),
-                        'Toplam Miktar': miktar
-                    })
-                pd.DataFrame(product_export).to_excel(writer, index=False, sheet_name="Ürün Toplamları")
-            
-            output.seek(0)
+            # Çıktı yalnızca indirme anında hazırlanır (aynı format ve seçeneklerle tekrar kullanılır)
+            extension = EXPORT_FORMATS.get(st.session_state.get("export_format"), "xlsx")
+            split_by_store = st.session_state.get("split_by_store", False)
+            if split_by_store:
+                # Her mağaza ayrı dosya; mağaza dosyaları işçi havuzunda paralel yazılır ve
+                # zip, indirme anında geçici dosyaya oluşturulur (baytlar önbelleğe alınmaz)
+                prepare_export = partial(prepare_split_export, caches.export, conversion_key, result, extension, profiler)
+                label = f"📥 Mağaza Dosyalarını İndir ({len(store_totals):,} × .{extension}, zip)"
+            else:
+                prepare_export = partial(
+                    cached_export,
+                    caches.export,
+                    conversion_key,
+                    result,
+                    extension,
+                    include_summary=st.session_state.get("include_summary", True),
+                    include_product_sheet=st.session_state.get("include_product_sheet", True),
+                    profiler=profiler,
+                    summary=summary
+                )
+                label = "📥 Dönüştürülmüş Excel'i İndir" if extension == "xlsx" else f"📥 Dönüştürülmüş Dosyaları İndir (.{extension}, zip)"
+            date_format = DATE_FORMATS[st.session_state.get("export_date_format", "YYYYMMDD_HHMM")]
             
             # İndirme butonu
             col1, col2, col3 = st.columns([1, 2, 1])
             with col2:
                 st.download_button(
-                    label="📥 Dönüştürülmüş Excel'i İndir",
-                    data=output,
-                    file_name=f"{uploaded_file.name.split('.')[0]}_donusturulmus_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    label=label,
+                    data=prepare_export,
+                    file_name=export_file_name(
+                        source_name, date_format, "xlsx" if extension == "xlsx" and not split_by_store else "zip"
+                    ),
+                    mime="application/zip" if split_by_store else export_mime(extension)
                 )
             
+            # Bölünmüş çıktı daha önce hazırlandıysa dosya bazında süreleri göster
+            split_files = split_export_files(caches.export, conversion_key, extension) if split_by_store else None
+            if split_files:
+                with st.expander(f"⏱️ Mağaza Dosyaları ({len(split_files):,} dosya)"):
+                    split_df = pd.DataFrame(split_files, columns=["Dosya", "Satır", "Boyut (bayt)", "Süre (sn)"])
+                    st.caption(
+                        f"Toplam yazma süresi {split_df['Süre (sn)'].sum():.2f} sn · "
+                        f"en yavaş dosya {split_df['Süre (sn)'].max():.3f} sn"
+                    )
+                    st.dataframe(
+                        split_df.sort_values("Süre (sn)", ascending=False).head(PAGE_SIZE),
+                        use_container_width=True,
+                        hide_index=True
+                    )
+            
             # Ek özellikler
             with st.expander("📋 Dönüştürülmüş Veriyi Önizle"):
                 preview_count = st.slider("Önizlenecek satır sayısı:", 10, 100, 30)
-                preview_df = result_df.head(preview_count).copy()
-                # Önizleme için açıklamaları kısalt
-                preview_df['MALZEME TANIMI'] = preview_df['MALZEME TANIMI'].apply(
-                    lambda x: x[:40] + "..." if len(x) > 40 else x
-                )
+                preview_df = description_columns(output_frame(result_df.head(preview_count)), 'MALZEME TANIMI')
                 st.dataframe(
                     preview_df,
                     use_container_width=True,
@@ -363,22 +765,28 @@ if uploaded_file:
                 col1, col2 = st.columns(2)
                 
                 with col1:
-                    include_summary = st.checkbox("Özet sayfalarını dahil et", value=True)
-                    include_product_sheet = st.checkbox("Ürün toplamları sayfasını dahil et", value=True)
+                    include_summary = st.checkbox("Özet sayfalarını dahil et", value=True, key="include_summary")
+                    include_product_sheet = st.checkbox("Ürün toplamları sayfasını dahil et", value=True, key="include_product_sheet")
+                    st.checkbox(
+                        "Mağaza bazında ayrı dosyalar",
+                        key="split_by_store",
+                        help="Her mağazanın siparişleri seçilen formatta ayrı bir dosyaya yazılır; dosyalar tek bir zip içinde indirilir"
+                    )
                 
                 with col2:
-                    date_format = st.selectbox(
+                    st.selectbox(
                         "Dosya adı için tarih formatı:",
-                        ["YYYYMMDD_HHMM", "DD-MM-YYYY", "YYYY-MM-DD"]
+                        list(DATE_FORMATS),
+                        key="export_date_format"
                     )
                     
                 if st.button("🔄 Özel Dışa Aktarma Oluştur"):
                     st.info("Seçilen ayarlarla özel dışa aktarma oluşturuldu!")
     
-    else:
+    elif not (low_memory or pending):
         st.error("❌ İşlenecek veri yok. Lütfen dosya formatını kontrol edin.")
 
-else:
+elif not consolidation_mode:
     # Dosya yüklenmediğinde hoş geldin ekranı
     st.markdown("""
     ### 👋 Mağaza Sipariş Dönüştürücüye Hoş Geldiniz!
@@ -409,19 +817,7 @@ else:
     
     # Örnek veri bilgisi
     with st.expander("📄 Örnek Girdi Formatını Görüntüle"):
-        sample_data = {
-            'Hmk Kod': ['30.77.0111-1325', '30.77.0111-1235', '30.77.0111-990'],
-            'Hmk Ürün Açıklama': [
-                'ESL HS ÜÇGE R2004 (TİP1)', 
-                'ESL HS ÜÇGE R2004 (TİP2)', 
-                'ESL HS GÖKÇELİK R2004'
-            ],
-            '7684 M': [75, 0, 225],
-            '8373 M': [0, 0, 550],
-            '8105 MM': [0, 500, 100],
-            'TOPLAM': [75, 500, 875]
-        }
-        st.dataframe(pd.DataFrame(sample_data), use_container_width=True, hide_index=True)
+        st.markdown(SAMPLE_INPUT_TABLE)
 
 # Alt bilgi
 st.markdown("---")
@@ -471,7 +867,6 @@ with st.sidebar:
         st.metric("İşlenen Dosyalar", "0")
     
     st.markdown("### 🔧 Ayarlar")
-    show_advanced = st.checkbox("Gelişmiş seçenekleri göster")
     
     # Store pattern bilgisi
     with st.expander("🏪 Store Pattern Bilgisi"):
@@ -493,31 +888,53 @@ with st.sidebar:
         - ✅ Manuel güncelleme gerektirmez
         """)
     
-    if show_advanced:
+    # Ayar bileşenleri her çalıştırmada çizilir (panel kapalıyken de); yalnızca
+    # koşullu çizilen bileşenlerin session_state anahtarları Streamlit tarafından silinir
+    with st.expander("⚙️ Gelişmiş Seçenekler"):
         min_quantity = st.number_input(
             "Minimum miktar eşiği:",
             min_value=1,
             max_value=100,
-            value=10,
+            value=DEFAULT_THRESHOLD,
+            key="min_quantity",
             help="Bu miktarın altındaki siparişler filtrelenecektir"
         )
         
-        export_format = st.radio(
-            "Dışa aktarma formatı:",
-            ["Excel (.xlsx)", "CSV (.csv)"],
-            help="Çıktı dosyası formatını seçin"
+        st.checkbox(
+            "Düşük bellek modu",
+            key="low_memory_mode",
+            help=f"Dosyayı parça parça işler; {LOW_MEMORY_FILE_SIZE // 1024**2} MB üzeri dosyalarda otomatik olarak açılır"
         )
         
-        if export_format == "CSV (.csv)":
-            st.warning("CSV formatı henüz desteklenmiyor. Excel kullanın.")
+        st.radio(
+            "Dışa aktarma formatı:",
+            list(EXPORT_FORMATS),
+            key="export_format",
+            help="CSV ve Parquet seçildiğinde her sayfa ayrı bir dosya olarak tek bir zip içinde indirilir"
+        )
         
-        show_descriptions = st.checkbox("Ürün açıklamalarını göster", value=True)
-        description_length = st.slider(
+        st.checkbox("Ürün açıklamalarını göster", value=True, key="show_descriptions")
+        st.slider(
             "Açıklama uzunluğu limiti:",
-            20, 100, 60,
-            help="Görüntülenen açıklamaların maksimum karakter sayısı"
+            20, 100, DESCRIPTION_LENGTH,
+            key="description_length",
+            help="Ürün tablolarında ve önizlemede görüntülenen açıklamaların maksimum karakter sayısı"
         )
     
+    if ARCHIVE_AVAILABLE:
+        st.markdown("### 🗂️ Geçmiş Dönüşümler")
+        archived_entries = {entry.path: entry for entry in archived_conversions(ARCHIVE_DIR)}
+        if archived_entries:
+            st.selectbox(
+                "Arşivden aç:",
+                [None, *archived_entries],
+                format_func=lambda path: "—" if path is None else f"{archived_entries[path].created:%d.%m.%Y %H:%M} · {archived_entries[path].source}",
+                key="archived_conversion",
+                help="Dosya yüklenmemişken seçilen dönüşüm Excel yeniden okunmadan açılır"
+            )
+        else:
+            st.caption("Henüz arşivlenmiş dönüşüm yok.")
+    
     st.markdown("### 📞 Destek")
     with st.expander("Yardıma mı ihtiyacınız var?"):
         st.markdown(
@@ -542,8 +959,10 @@ with st.sidebar:
     st.markdown("### 🎯 Kısayollar")
     st.markdown(
         """
-        💡 **İpucu:** Birden fazla dosyayı dönüştürmek için 
-        her dosyayı ayrı ayrı yükleyin ve işleyin.
+        💡 **İpucu:** Birden fazla dosyanın toplamlarını birleştirmek için
+        sayfanın üstündeki **Çoklu dosya birleştirme** modunu açın; dosyaları
+        ayrı ayrı dönüştürmek için `python batch.py <dizin> -o <çıktı dizini>`
+        komutunu kullanın.
         
         📊 **Ürün Analizi:** Hangi ürünlerin en çok sipariş edildiğini
         görmek için sağ taraftaki listeyi kontrol edin.
@@ -569,9 +988,35 @@ if st.checkbox("", key="dev_mode", help="Geliştirici modu"):
         if 'product_descriptions' in locals():
             st.write(f"Benzersiz ürün sayısı: {len(product_descriptions)}")
             st.write(f"Ürün açıklaması olan kayıt sayısı: {sum(1 for v in product_descriptions.values() if v)}")
+    
+    # Aşama bazında süre dağılımı (son çalıştırma)
+    st.markdown("### ⏱️ Aşama Süreleri")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.checkbox("Bellek tepelerini ölç (yavaş)", key="profile_memory")
+    with col2:
+        st.checkbox(f"Ölçümleri {PROFILE_LOG_PATH} dosyasına yaz", key="profile_to_log")
+    
+    profile_log = st.session_state.get("profile_log")
+    if profile_log:
+        last_run = profile_log[-1]["run"]
+        stages_df = pd.DataFrame([record for record in profile_log if record["run"] == last_run])
+        stage_summary = stages_df.groupby("stage", sort=False).agg(
+            wall_s=("wall_s", "sum"),
+            cpu_s=("cpu_s", "sum"),
+            rows_in=("rows_in", "sum"),
+            rows_out=("rows_out", "sum"),
+            peak_mb=("peak_mb", "max"),
+            calls=("stage", "size"),
+        )
+        st.caption(f"Son çalıştırma: {last_run} · toplam {stage_summary['wall_s'].sum():.3f} sn")
+        st.bar_chart(stage_summary["wall_s"])
+        st.dataframe(stage_summary, use_container_width=True)
+    else:
+        st.caption("Henüz ölçüm yok; bir dosya yükleyin (önbellekten gelen sonuçlar ölçülmez).")
 
 # Ürün arama özelliği (ana sayfada, dosya yüklendiyse)
-if uploaded_file and 'product_descriptions' in locals() and product_descriptions:
+if (uploaded_file or archived_path) and 'product_descriptions' in locals() and product_descriptions:
     st.markdown("---")
     st.markdown("### 🔎 Ürün Arama")
     
@@ -580,26 +1025,29 @@ if uploaded_file and 'product_descriptions' in locals() and product_descriptions
         search_product = st.text_input("Ürün kodu veya açıklama ara:", placeholder="örn: 30.77 veya ÜÇGE")
     
     if search_product:
-        # Ürün kodunda veya açıklamada arama yap
-        search_results = []
-        search_term = search_product.upper()
+        # Ürün kodunda veya açıklamada arama yap (indeks dönüşüm başına bir kez kurulur)
+        search_key = ("search", conversion_key)
+        search_index = caches.lookup.get(search_key)
+        if search_index is None:
+            search_index = ProductSearchIndex(product_descriptions, product_totals)
+            caches.lookup.put(search_key, search_index, search_index.nbytes)
         
-        for kod, aciklama in product_descriptions.items():
-            if search_term in kod.upper() or search_term in aciklama.upper():
-                if kod in product_totals:
-                    search_results.append({
-                        'Ürün Kodu': kod,
-                        'Açıklama': aciklama,
-                        'Toplam Miktar': product_totals[kod]
-                    })
+        matched_codes = search_index.search(search_product)
         
-        if search_results:
+        if matched_codes:
             with col2:
-                st.info(f"**{len(search_results)} ürün bulundu**")
+                st.info(f"**{len(matched_codes)} ürün bulundu**")
             
-            # Sonuçları göster
-            search_df = pd.DataFrame(search_results).sort_values('Toplam Miktar', ascending=False)
-            search_df['Toplam Miktar'] = search_df['Toplam Miktar'].apply(lambda x: f"{x:,}")
+            # Sonuçları göster (indeks önce kodu sorguyla başlayanları döndürür, gruplar
+            # kendi içinde toplam miktara göre sıralıdır);
+            # tablo yalnızca görünen sayfadaki ürünler için kurulur
+            page_codes = matched_codes[page_slice(len(matched_codes), key=f"search_page_{search_product}")]
+            search_df = pd.DataFrame({
+                'Ürün Kodu': page_codes,
+                'Açıklama': [product_descriptions[kod] for kod in page_codes],
+                'Toplam Miktar': [product_totals[kod] for kod in page_codes],
+            })
+            search_df['Toplam Miktar'] = format_thousands(search_df['Toplam Miktar'])
             
             st.dataframe(
                 search_df,
@@ -610,19 +1058,20 @@ if uploaded_file and 'product_descriptions' in locals() and product_descriptions
             # Ürün detayları
             if st.checkbox("Seçili ürünün mağaza dağılımını göster"):
                 selected_product = st.selectbox(
-                    "Ürün seçin:",
-                    options=[r['Ürün Kodu'] for r in search_results],
+                    "Ürün seçin (görünen sayfadan):",
+                    options=page_codes,
                     format_func=lambda x: f"{x} - {product_descriptions.get(x, '')[:50]}"
                 )
                 
                 if selected_product:
                     # Bu ürünün mağaza dağılımını göster
-                    product_stores = result_df[result_df['Kod'] == selected_product][['Mağaza Kodu2', 'Adet']]
-                    product_stores = product_stores.groupby('Mağaza Kodu2')['Adet'].sum().reset_index()
+                    product_stores = result_df.iloc[lookup_index.products.rows(selected_product)][['Mağaza Kodu2', 'Adet']]
+                    product_stores = product_stores.groupby('Mağaza Kodu2', observed=True)['Adet'].sum().reset_index()
                     product_stores = product_stores.sort_values('Adet', ascending=False)
-                    product_stores['Adet'] = product_stores['Adet'].apply(lambda x: f"{x:,}")
                     
                     st.markdown(f"**{selected_product} - Mağaza Dağılımı:**")
+                    product_stores = product_stores.iloc[page_slice(len(product_stores), key=f"product_page_{selected_product}")]
+                    product_stores['Adet'] = format_thousands(product_stores['Adet'])
                     st.dataframe(
                         product_stores,
                         use_container_width=True,
@@ -0,0 +1,155 @@
+"""Dönüştürülmüş siparişlerin yerel sütunlu arşivi (Arrow IPC)
+
+Her dönüşüm tarih ve kaynak dosyaya göre bölümlenmiş bir dizine tek bir Arrow
+IPC dosyası olarak yazılır:
+    
+    conversions/date=2024-05-17/source=siparis/143015_1a2b3c4d.arrow
+
+Arşiv ResultCache gibi sınırlıdır: her yazımdan sonra en yeni ARCHIVE_MAX_ENTRIES
+dönüşümden fazlası ve toplam boyutu ARCHIVE_MAX_BYTES'ı aşan eski dönüşümler silinir.
+
+Metin sütunları sözlük kodlamalıdır (mağaza ve ürün kodları çok kez tekrar eder);
+toplamlar ve ürün açıklamaları şema meta verisinde saklanır. Dosyalar bellek
+eşlemeli okunur, Excel'i yeniden okumaya gerek kalmaz.
+"""
+import glob
+import importlib.util
+import json
+import os
+import re
+from collections import namedtuple
+from datetime import datetime
+
+# pyarrow kuruluysa arşiv kullanılabilir. pyarrow ve dönüştürme modülleri yalnızca
+# arşive yazılırken veya okunurken yüklenir; listeleme için gerekmez
+ARCHIVE_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+# Varsayılan arşiv dizini
+ARCHIVE_DIR = "conversions"
+
+# Arşivde tutulan en fazla dönüşüm sayısı ve toplam boyut; aşılınca en eskiler silinir
+ARCHIVE_MAX_ENTRIES = 200
+ARCHIVE_MAX_BYTES = 2 * 1024**3
+
+# Dönüşüm bilgilerinin saklandığı şema meta veri anahtarı
+METADATA_KEY = b"order_conversion"
+
+# Arşivdeki bir dönüşüm: dosya yolu, dönüşüm tarihi/saati ve kaynak dosya adı (uzantısız)
+ArchiveEntry = namedtuple("ArchiveEntry", ["path", "created", "source"])
+
+def _source_name(original_filename):
+    """Dosya adını dizin adı olarak güvenle kullanılabilir hale getir"""
+    return re.sub(r'[^\w.-]+', '_', original_filename.rsplit('.', 1)[0]).strip('._') or "dosya"
+
+def _dictionary_table(output_df):
+    """Uzun tabloyu metin sütunları sözlük kodlamalı bir Arrow tablosuna çevir"""
+    import pyarrow as pa
+    
+    table = pa.Table.from_pandas(output_df, preserve_index=False)
+    for pos, field in enumerate(table.schema):
+        if pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+            table = table.set_column(pos, field.name, table.column(pos).dictionary_encode())
+    return table
+
+def save_conversion(result, original_filename, digest, threshold, root=ARCHIVE_DIR, created=None,
+                    max_entries=ARCHIVE_MAX_ENTRIES, max_bytes=ARCHIVE_MAX_BYTES):
+    """Dönüşüm sonucunu arşive yaz, arşivi sınırlar içinde tut ve dosya yolunu döndür"""
+    import pyarrow as pa
+    
+    output_df, store_totals, product_count, store_count, (product_totals, product_descriptions) = result
+    created = created or datetime.now()
+    directory = os.path.join(root, f"date={created:%Y-%m-%d}", f"source={_source_name(original_filename)}")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{created:%H%M%S}_{digest[:8]}.arrow")
+    
+    # Sözlükler sırası korunsun diye çift listesi olarak yazılır
+    metadata = {
+        "original_filename": original_filename,
+        "created": created.isoformat(timespec="seconds"),
+        "threshold": threshold,
+        "product_count": product_count,
+        "store_count": store_count,
+        "columns": list(output_df.columns),
+        "store_totals": list(store_totals.items()),
+        "product_totals": list(product_totals.items()),
+        "product_descriptions": list(product_descriptions.items()),
+    }
+    table = _dictionary_table(output_df)
+    table = table.replace_schema_metadata({METADATA_KEY: json.dumps(metadata, ensure_ascii=False)})
+    
+    # Yarım kalan yazımlar listede görünmesin diye önce geçici dosyaya yazılır
+    temporary = path + ".tmp"
+    with pa.OSFile(temporary, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(temporary, path)
+    prune_conversions(root, max_entries, max_bytes, keep=path)
+    return path
+
+def prune_conversions(root=ARCHIVE_DIR, max_entries=ARCHIVE_MAX_ENTRIES, max_bytes=ARCHIVE_MAX_BYTES, keep=None):
+    """Sınırları aşan en eski dönüşümleri sil; silinen dosya sayısını döndür
+    
+    keep (yeni yazılan dosya) tek başına sınırı aşsa da silinmez. Boşalan
+    tarih/kaynak dizinleri de kaldırılır.
+    """
+    kept_count = kept_bytes = removed = 0
+    full = False
+    for entry in list_conversions(root):
+        try:
+            size = os.path.getsize(entry.path)
+        except OSError:
+            continue
+        # Sınıra ulaşıldıktan sonra daha eski (küçük de olsa) dönüşümler tutulmaz
+        full = full or kept_count >= max_entries or kept_bytes + size > max_bytes
+        if entry.path == keep or not full:
+            kept_count += 1
+            kept_bytes += size
+            continue
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            # Başka bir işçi aynı anda silmiş
+            continue
+        removed += 1
+        try:
+            os.removedirs(os.path.dirname(entry.path))
+        except OSError:
+            pass
+    return removed
+
+def load_conversion(path):
+    """Arşivdeki dönüşümü bellek eşlemeli oku; (orijinal dosya adı, sonuç) döndür
+    
+    Sonuç convert_file ile aynı biçimdedir; sözlük kodlamalı sütunlar pandas'ta
+    kategorik olarak gelir.
+    """
+    import pyarrow as pa
+    from converter import COMPACT_COLUMNS
+    
+    table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    metadata = json.loads(table.schema.metadata[METADATA_KEY])
+    # Yazılan sütunlar (zenginleştirme sütunları dahil) okunur; sütun listesi
+    # olmayan eski arşivlerdeki boş sütunlar okunmaz, dışa aktarmada yeniden eklenir
+    columns = metadata.get("columns", COMPACT_COLUMNS)
+    output_df = table.select([name for name in columns if name in table.column_names]).to_pandas()
+    result = (
+        output_df,
+        dict(metadata["store_totals"]),
+        metadata["product_count"],
+        metadata["store_count"],
+        (dict(metadata["product_totals"]), dict(metadata["product_descriptions"])),
+    )
+    return metadata["original_filename"], result
+
+def list_conversions(root=ARCHIVE_DIR):
+    """Arşivdeki dönüşümleri en yeniden eskiye doğru listele (dosyalar açılmaz)"""
+    entries = []
+    for path in glob.glob(os.path.join(root, "date=*", "source=*", "*.arrow")):
+        date_dir, source_dir = path.split(os.sep)[-3:-1]
+        try:
+            created = datetime.strptime(f"{date_dir[5:]} {os.path.basename(path)[:6]}", "%Y-%m-%d %H%M%S")
+        except ValueError:
+            continue
+        entries.append(ArchiveEntry(path, created, source_dir[7:]))
+    entries.sort(key=lambda entry: entry.created, reverse=True)
+    return entries
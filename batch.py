@@ -0,0 +1,239 @@
+"""Komut satırından toplu dönüştürme (tarayıcı oturumu gerektirmez)
+
+Kullanım:
+    python batch.py siparisler/ -o donusturulen/
+    python batch.py "siparisler/*.xlsx" -o donusturulen/ -j 4
+    python batch.py buyuk_siparis.xlsx -o donusturulen/ --stream
+    python batch.py siparisler/ -o donusturulen/ --format csv
+    python batch.py siparisler/ --consolidate haftalik.xlsx
+    python batch.py siparis.xlsx -o donusturulen/ --split -j 8
+    python batch.py siparisler/ -o donusturulen/ --store-master magazalar.xlsx --price-list fiyatlar.csv
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from consolidate import consolidate_files, files_frame
+from converter import DEFAULT_THRESHOLD, STORE_PATTERN
+from enrichment import PRICE_LIST_PATH, STORE_MASTER_PATH, convert_checked, load_reference_data
+from exporter import EXPORT_FORMATS, build_consolidated_export, build_export, export_file_name, write_split_export
+from streaming import CHUNK_ROWS, stream_convert_file
+
+EXCEL_EXTENSIONS = (".xlsx", ".xls")
+
+def collect_inputs(sources):
+    """Dizin ve glob girdilerini sıralı, tekrarsız dosya listesine aç"""
+    paths = []
+    for source in sources:
+        if os.path.isdir(source):
+            candidates = [os.path.join(source, name) for name in os.listdir(source)]
+        else:
+            candidates = glob.glob(source)
+        for path in sorted(candidates):
+            # Excel'in açık dosyalar için bıraktığı kilit dosyalarını atla
+            name = os.path.basename(path)
+            if name.lower().endswith(EXCEL_EXTENSIONS) and not name.startswith("~$") and os.path.isfile(path):
+                paths.append(os.path.abspath(path))
+    return list(dict.fromkeys(paths))
+
+def output_paths(paths, output_dir, extension):
+    """Her girdi için çakışmayan çıktı yolu seç
+    
+    Aynı adlı girdiler (farklı dizinlerden) veya dizinde zaten bulunan dosyalar
+    için ada sayaç eklenir; hiçbir çıktı başka bir çıktının üzerine yazılmaz.
+    """
+    taken = set()
+    outputs = []
+    for path in paths:
+        stem, suffix = os.path.splitext(export_file_name(os.path.basename(path), extension=extension))
+        candidate = os.path.join(output_dir, stem + suffix)
+        counter = 2
+        while candidate in taken or os.path.exists(candidate):
+            candidate = os.path.join(output_dir, f"{stem}_{counter}{suffix}")
+            counter += 1
+        taken.add(candidate)
+        outputs.append(candidate)
+    return outputs
+
+def convert_one(path, output_path, threshold=DEFAULT_THRESHOLD, store_pattern=STORE_PATTERN, chunk_rows=None,
+                extension="xlsx", store_master=None, price_list=None):
+    """Tek dosyayı dönüştür ve yaz (işçi süreçte çalışır)
+    
+    chunk_rows verilirse dosya parça parça (sınırlı bellekle) dönüştürülür;
+    akış modu yalnızca Excel çıktısı üretir ve TOPLAM mutabakatı yapmaz. xlsx
+    dışındaki formatlar zip olarak yazılır. Referans dosyaları her işçide bir kez okunur.
+    output_path (output_paths ile seçilir) zaten varsa dosya yazılmaz, hata döner.
+    """
+    started = time.perf_counter()
+    original_filename = os.path.basename(path)
+    try:
+        reference = load_reference_data(store_master, price_list)
+        reconciliation = None
+        if chunk_rows:
+            # Akış modunda sonucun ilk elemanı yazılan satır sayısıdır
+            with open(output_path, "xb") as output:
+                store_cols, _, result = stream_convert_file(
+                    path, output, original_filename, threshold, store_pattern, chunk_rows, reference=reference
+                )
+            if result is None:
+                # Mağaza sütunu yoksa çalışma kitabı yazılmaz; boş dosya bırakılmaz
+                os.remove(output_path)
+            row_count = result[0] if result is not None else 0
+        else:
+            (store_cols, _, result), _, reconciliation = convert_checked(
+                path, original_filename, threshold, store_pattern, reference=reference
+            )
+            if result is not None:
+                with open(output_path, "xb") as output:
+                    output.write(build_export(result, extension))
+            row_count = len(result[0]) if result is not None else 0
+        if result is None:
+            return {"path": path, "error": "Mağaza sütunları bulunamadı", "seconds": time.perf_counter() - started}
+        
+        _, store_totals, product_count, store_count, _ = result
+        return {
+            "path": path,
+            "output": output_path,
+            "rows": row_count,
+            "products": product_count,
+            "stores": len(store_totals),
+            "store_columns": store_count,
+            "mismatches": len(reconciliation.mismatches) if reconciliation is not None else 0,
+            "seconds": time.perf_counter() - started,
+        }
+    except Exception as exc:
+        return {"path": path, "error": f"{type(exc).__name__}: {exc}", "seconds": time.perf_counter() - started}
+
+def consolidate_main(paths, output_path, threshold=DEFAULT_THRESHOLD, jobs=None):
+    """Dosyaları paralel dönüştür ve birleştirilmiş çalışma kitabını yaz"""
+    started = time.perf_counter()
+    consolidation = consolidate_files(
+        [(path, os.path.basename(path)) for path in paths], threshold, STORE_PATTERN,
+        max_workers=jobs, executor_class=ProcessPoolExecutor
+    )
+    files_df = files_frame(consolidation)
+    for summary in consolidation.files:
+        if summary.error:
+            print(f"HATA  {summary.name}: {summary.error}")
+        else:
+            print(f"OK    {summary.name}: {summary.rows:,} satır, {summary.products:,} ürün, {summary.stores:,} mağaza")
+    
+    with open(output_path, "wb") as output:
+        output.write(build_consolidated_export(consolidation, files_df))
+    failures = sum(1 for summary in consolidation.files if summary.error)
+    print(
+        f"{len(paths) - failures}/{len(paths)} dosya birleştirildi: {len(consolidation.store_totals):,} mağaza, "
+        f"{len(consolidation.product_totals):,} ürün ({time.perf_counter() - started:.2f} sn) -> {output_path}"
+    )
+    return 1 if failures else 0
+
+def split_main(paths, output_dir, threshold=DEFAULT_THRESHOLD, extension="xlsx", jobs=None, slowest=5,
+               store_master=None, price_list=None):
+    """Dosyaları sırayla dönüştür, her birini mağaza bazında ayrı dosyalar halinde zip'e yaz
+    
+    Paralellik dosyalar yerine mağaza dosyaları düzeyindedir; yazımlar süreç havuzunda yapılır.
+    """
+    started = time.perf_counter()
+    failures = 0
+    reference = load_reference_data(store_master, price_list)
+    for path, output_path in zip(paths, output_paths(paths, output_dir, "zip")):
+        original_filename = os.path.basename(path)
+        file_started = time.perf_counter()
+        try:
+            (_, _, result), _, _ = convert_checked(path, original_filename, threshold, STORE_PATTERN, reference=reference)
+            if result is None:
+                raise ValueError("Mağaza sütunları bulunamadı")
+            with open(output_path, "xb") as output:
+                files = write_split_export(output, result, extension, jobs, ProcessPoolExecutor)
+        except Exception as exc:
+            failures += 1
+            print(f"HATA  {original_filename}: {type(exc).__name__}: {exc} ({time.perf_counter() - file_started:.2f} sn)")
+            continue
+        
+        print(
+            f"OK    {original_filename}: {len(files):,} mağaza dosyası, {len(result[0]):,} satır "
+            f"({time.perf_counter() - file_started:.2f} sn, dosya yazımı toplam {sum(f.seconds for f in files):.2f} sn) -> {output_path}"
+        )
+        for split_file in sorted(files, key=lambda f: f.seconds, reverse=True)[:slowest]:
+            print(f"      {split_file.name}: {split_file.rows:,} satır, {split_file.nbytes:,} bayt ({split_file.seconds:.3f} sn)")
+    
+    print(f"{len(paths) - failures}/{len(paths)} dosya mağaza bazında bölündü ({time.perf_counter() - started:.2f} sn)")
+    return 1 if failures else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Müşteri sipariş dosyalarını toplu olarak dönüştür")
+    parser.add_argument("sources", nargs="+", help="Excel dosyaları içeren dizin veya glob deseni")
+    parser.add_argument("-o", "--output-dir", default="donusturulen", help="Dönüştürülmüş dosyaların yazılacağı dizin")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Paralel süreç sayısı (varsayılan: CPU sayısı)")
+    parser.add_argument("--threshold", type=int, default=DEFAULT_THRESHOLD, help="Minimum miktar eşiği")
+    parser.add_argument("--stream", action="store_true", help="Büyük dosyaları parça parça, sınırlı bellekle dönüştür")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="Akış modunda parça başına satır sayısı")
+    parser.add_argument("--format", choices=sorted(set(EXPORT_FORMATS.values())), default="xlsx",
+                        help="Çıktı formatı (csv, csv.gz ve parquet her sayfayı ayrı dosya olarak zip içinde yazar)")
+    parser.add_argument("--consolidate", metavar="XLSX", help="Dosyaları ayrı ayrı yazmak yerine toplamlarını tek çalışma kitabında birleştir")
+    parser.add_argument("--split", action="store_true", help="Her mağaza için ayrı dosya yaz (dosya başına bir zip)")
+    parser.add_argument("--store-master", default=STORE_MASTER_PATH,
+                        help="Mağaza Kodu/Mağaza Adı sütunlu mağaza listesi (varsayılan: SIPARIS_STORE_MASTER)")
+    parser.add_argument("--price-list", default=PRICE_LIST_PATH,
+                        help="Kod/Birim Fiyat sütunlu fiyat listesi (varsayılan: SIPARIS_PRICE_LIST)")
+    args = parser.parse_args(argv)
+    
+    paths = collect_inputs(args.sources)
+    if not paths:
+        print("Dönüştürülecek Excel dosyası bulunamadı", file=sys.stderr)
+        return 1
+    try:
+        # Referans dosyaları işçilerden önce bir kez denetlenir; hatalı dosya tüm işi durdurur
+        load_reference_data(args.store_master, args.price_list)
+    except (OSError, ValueError) as exc:
+        print(f"Referans dosyası okunamadı: {exc}", file=sys.stderr)
+        return 1
+    if args.consolidate:
+        return consolidate_main(paths, args.consolidate, args.threshold, args.jobs)
+    os.makedirs(args.output_dir, exist_ok=True)
+    if args.split:
+        return split_main(
+            paths, args.output_dir, args.threshold, args.format, args.jobs,
+            store_master=args.store_master, price_list=args.price_list
+        )
+    
+    started = time.perf_counter()
+    failures = 0
+    total_rows = 0
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        chunk_rows = args.chunk_rows if args.stream else None
+        # Çıktı adları işçilere dağıtılmadan önce tek yerde seçilir
+        outputs = output_paths(paths, args.output_dir, "xlsx" if chunk_rows or args.format == "xlsx" else "zip")
+        futures = [
+            executor.submit(
+                convert_one, path, output_path, args.threshold, STORE_PATTERN, chunk_rows, args.format,
+                args.store_master, args.price_list
+            )
+            for path, output_path in zip(paths, outputs)
+        ]
+        for future in as_completed(futures):
+            report = future.result()
+            name = os.path.basename(report["path"])
+            if "error" in report:
+                failures += 1
+                print(f"HATA  {name}: {report['error']} ({report['seconds']:.2f} sn)")
+            else:
+                total_rows += report["rows"]
+                print(
+                    f"OK    {name}: {report['rows']:,} satır, {report['products']:,} ürün, "
+                    f"{report['stores']:,} mağaza ({report['seconds']:.2f} sn) -> {report['output']}"
+                )
+                if report["mismatches"]:
+                    print(f"      {report['mismatches']:,} üründe mağaza toplamı TOPLAM sütunuyla tutmuyor")
+    
+    print(
+        f"{len(paths) - failures}/{len(paths)} dosya dönüştürüldü, "
+        f"{total_rows:,} satır ({time.perf_counter() - started:.2f} sn)"
+    )
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,349 @@
+"""Dönüştürme hattı için performans ölçümü ve sentetik sipariş dosyası üretici
+
+Kullanım:
+    python benchmark.py run --products 3000 --stores 800 --repeat 3
+    python benchmark.py generate ornek.xlsx --products 500 --stores 120
+    python benchmark.py compare onceki.jsonl sonraki.jsonl
+    python benchmark.py startup --repeat 5 --budget 1.0
+
+Sonuçlar JSON satırları olarak eklenir (varsayılan: benchmark_results.jsonl);
+her kayıt commit, parametreler ve aşama bazında süre/bellek bilgisini içerir.
+startup uygulamanın dosya yüklenmeden ilk çizimini her seferinde yeni bir
+süreçte ölçer; ağır bir modül yüklenirse veya süre bütçeyi aşarsa 1 döner.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+from converter import (
+    DEFAULT_THRESHOLD, PRODUCT_CODE_COLUMN, PRODUCT_DESCRIPTION_COLUMN, READ_ENGINE, clean_values, convert_file
+)
+from exporter import build_excel_export
+from profiling import StageProfiler
+
+# Ölçülen aşamalar; "detect" başlığın çözülüp gereken sütunların seçilmesidir
+# (openpyxl'de başlık satırının okunması dahil, calamine'de "read"den sonra)
+PHASES = ["read", "detect", "clean", "reshape", "aggregate", "export"]
+
+# Girdi dosyalarında görülen mağaza sütunu biçimleri ("7684 M", "8105 MM", "798")
+DEFAULT_SUFFIX_MIX = {"M": 0.5, "MM": 0.3, "": 0.2}
+
+# Metin olarak girilmiş miktar örnekleri (boşluk, virgül, tire, boş metin)
+TEXT_VALUES = ["1 200", "12,5", "-", "", " 75 ", "250,0", "1 000", "-"]
+
+# Hücre başına olası sipariş miktarları (eşiğin altındakiler dahil)
+PACK_SIZES = np.array([1, 5, 6, 10, 12, 24, 25, 50, 75, 100, 150, 225, 500])
+
+# Dosya yüklenmeden çizilen ilk ekranda yüklenmemesi gereken modüller
+STARTUP_HEAVY_MODULES = ["pandas", "numpy", "openpyxl", "pyarrow"]
+
+# Ayrı süreçte çalışır: uygulamayı dosyasız çalıştırır ve süreleri JSON olarak yazdırır
+STARTUP_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+app = AppTest.from_file(sys.argv[1], default_timeout=120).run()
+painted = time.perf_counter()
+app.run()
+print(json.dumps({
+    "streamlit_import_s": imported - started,
+    "first_paint_s": painted - imported,
+    "rerun_s": time.perf_counter() - painted,
+    "loaded": [name for name in json.loads(sys.argv[2]) if name in sys.modules],
+    "errors": [str(error.value) for error in app.exception],
+}))
+"""
+
+def parse_suffix_mix(text):
+    """Mağaza soneki ağırlıklarını çöz (örn: "M=0.5,MM=0.3,=0.2")"""
+    mix = {}
+    for part in text.split(","):
+        suffix, _, weight = part.partition("=")
+        mix[suffix.strip()] = float(weight)
+    return mix
+
+def generate_order_sheet(products=3000, stores=800, density=0.15, text_ratio=0.05,
+                         suffix_mix=None, seed=0):
+    """Müşteri sipariş dosyası biçiminde sentetik bir çalışma kitabı üret (xlsx baytları)
+    
+    density dolu mağaza hücrelerinin oranıdır; text_ratio dolu hücrelerden
+    kaçının metin olarak (virgüllü, boşluklu, "-" veya boş) yazılacağını belirler.
+    """
+    rng = np.random.default_rng(seed)
+    suffix_mix = suffix_mix or DEFAULT_SUFFIX_MIX
+    suffixes = list(suffix_mix)
+    weights = np.array([suffix_mix[s] for s in suffixes], dtype=float)
+    
+    codes = rng.choice(np.arange(100, 10000), size=stores, replace=False)
+    chosen = rng.choice(len(suffixes), size=stores, p=weights / weights.sum())
+    store_headers = [f"{code} {suffixes[i]}" if suffixes[i] else str(code) for code, i in zip(codes, chosen)]
+    
+    filled = rng.random((products, stores)) < density
+    quantities = np.where(filled, rng.choice(PACK_SIZES, size=(products, stores)), 0)
+    as_text = filled & (rng.random((products, stores)) < text_ratio)
+    text_choice = rng.integers(0, len(TEXT_VALUES), size=(products, stores))
+    # TOPLAM hücreye gerçekten yazılan değerlerden, dönüştürücünün okuyacağı şekilde hesaplanır
+    text_quantities = clean_values(TEXT_VALUES, 0)
+    row_totals = np.where(as_text, text_quantities[text_choice], quantities).sum(axis=1)
+    
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    sheet.append(["Sıra", PRODUCT_CODE_COLUMN, PRODUCT_DESCRIPTION_COLUMN, *store_headers, "TOPLAM"])
+    for row in range(products):
+        values = []
+        for col in range(stores):
+            if as_text[row, col]:
+                values.append(TEXT_VALUES[text_choice[row, col]])
+            elif filled[row, col]:
+                values.append(int(quantities[row, col]))
+            else:
+                values.append(None)
+        sheet.append([
+            row + 1,
+            f"30.{77 + row % 5}.{row:04d}-{rng.integers(100, 2000)}",
+            f"ESL HS ÜÇGE R{rng.integers(1000, 9999)} (TİP{row % 7 + 1})",
+            *values,
+            int(row_totals[row]),
+        ])
+    
+    output = BytesIO()
+    workbook.save(output)
+    return output.getvalue()
+
+def run_phases(data, original_filename, threshold=DEFAULT_THRESHOLD, trace_memory=False):
+    """Dönüştürme hattını aşama aşama çalıştır; süreleri (ve istenirse bellek tepelerini) döndür"""
+    profiler = StageProfiler("benchmark", trace_memory=trace_memory)
+    store_cols, _, result = convert_file(BytesIO(data), original_filename, threshold, profiler=profiler)
+    with profiler.stage("export", rows_in=len(result[0])):
+        build_excel_export(result)
+    
+    totals = profiler.totals()
+    timings = {name: totals[name]["wall_s"] for name in PHASES}
+    peaks = {name: totals[name]["peak_mb"] for name in PHASES}
+    rows_in = next(record["rows_out"] for record in profiler.records if record["stage"] == "read")
+    return timings, peaks, {"rows_in": rows_in, "rows_out": len(result[0]), "store_columns": len(store_cols)}
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _max_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        # Windows'ta resource modülü yok
+        return None
+    # Linux'ta KB, macOS'ta bayt cinsindendir
+    scale = 1024**2 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+def run_benchmark(params, repeat=3, trace_memory=True, label=None):
+    """Sentetik dosya üret, aşamaları ölç ve tek bir sonuç kaydı döndür"""
+    data = generate_order_sheet(
+        params["products"], params["stores"], params["density"], params["text_ratio"],
+        params["suffix_mix"], params["seed"]
+    )
+    
+    runs = []
+    for _ in range(repeat):
+        timings, _, counts = run_phases(data, "benchmark.xlsx", params["threshold"])
+        runs.append(timings)
+    
+    # Bellek ölçümü süreleri şişirdiği için ayrı bir turda yapılır
+    peaks = {}
+    if trace_memory:
+        _, peaks, _ = run_phases(data, "benchmark.xlsx", params["threshold"], trace_memory=True)
+    
+    phases = {}
+    for name in PHASES:
+        samples = [run[name] for run in runs]
+        phases[name] = {
+            "seconds_min": min(samples),
+            "seconds_median": statistics.median(samples),
+            "peak_mb": peaks.get(name),
+        }
+    
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "label": label,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "read_engine": READ_ENGINE,
+        "params": params,
+        "input_bytes": len(data),
+        **counts,
+        "repeat": repeat,
+        "phases": phases,
+        "total_seconds_median": sum(phase["seconds_median"] for phase in phases.values()),
+        "max_rss_mb": _max_rss_mb(),
+    }
+
+def run_startup(repeat=5, label=None):
+    """Uygulamanın soğuk açılışını her tekrarda yeni bir süreçte ölç"""
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPT, os.path.join(app_dir, "app.py"), json.dumps(STARTUP_HEAVY_MODULES)],
+            capture_output=True, text=True, check=True, cwd=app_dir
+        )
+        # Streamlit uyarıları stderr'e yazılır; sonuç son satırdadır
+        samples.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "label": label,
+        "python": platform.python_version(),
+        "kind": "startup",
+        "params": {"kind": "startup"},
+        "repeat": repeat,
+        "streamlit_import_seconds_median": statistics.median(sample["streamlit_import_s"] for sample in samples),
+        "first_paint_seconds_min": min(sample["first_paint_s"] for sample in samples),
+        "first_paint_seconds_median": statistics.median(sample["first_paint_s"] for sample in samples),
+        "rerun_seconds_median": statistics.median(sample["rerun_s"] for sample in samples),
+        "heavy_modules_loaded": sorted({name for sample in samples for name in sample["loaded"]}),
+        "errors": sorted({error for sample in samples for error in sample["errors"]}),
+    }
+
+def _params_key(params):
+    return json.dumps(params, sort_keys=True)
+
+def _load_results(path):
+    with open(path, encoding="utf-8") as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+def compare_results(base_path, head_path):
+    """Aynı parametrelerle alınmış iki sonuç dosyasının son kayıtlarını karşılaştır"""
+    base = {_params_key(record["params"]): record for record in _load_results(base_path)}
+    head = {_params_key(record["params"]): record for record in _load_results(head_path)}
+    common = [key for key in head if key in base]
+    if not common:
+        print("Ortak parametrelerle alınmış ölçüm bulunamadı", file=sys.stderr)
+        return 1
+    
+    for key in common:
+        old, new = base[key], head[key]
+        print(f"{key}\n  {old.get('commit')} -> {new.get('commit')}")
+        if new.get("kind") == "startup":
+            for name in ["first_paint", "rerun"]:
+                before, after = old[f"{name}_seconds_median"], new[f"{name}_seconds_median"]
+                ratio = after / before if before else float("nan")
+                print(f"  {name:<12} {before:9.3f} sn -> {after:9.3f} sn  ({ratio:5.2f}x)")
+            continue
+        for name in PHASES + ["total"]:
+            if name == "total":
+                before, after = old["total_seconds_median"], new["total_seconds_median"]
+            else:
+                before, after = old["phases"][name]["seconds_median"], new["phases"][name]["seconds_median"]
+            ratio = after / before if before else float("nan")
+            print(f"  {name:<10} {before:9.3f} sn -> {after:9.3f} sn  ({ratio:5.2f}x)")
+    return 0
+
+def _print_record(record):
+    print(
+        f"{record['params']['products']} ürün x {record['params']['stores']} mağaza, "
+        f"{record['rows_out']:,} çıktı satırı (commit {record['commit']})"
+    )
+    for name in PHASES:
+        phase = record["phases"][name]
+        peak = f"{phase['peak_mb']:8.1f} MB" if phase["peak_mb"] is not None else "       -"
+        print(f"  {name:<10} {phase['seconds_median']:9.3f} sn  {peak}")
+    print(f"  {'toplam':<10} {record['total_seconds_median']:9.3f} sn")
+
+def _print_startup(record):
+    print(f"Soğuk açılış, {record['repeat']} tekrar (commit {record['commit']})")
+    print(f"  {'streamlit':<12} {record['streamlit_import_seconds_median']:9.3f} sn")
+    print(f"  {'ilk çizim':<12} {record['first_paint_seconds_median']:9.3f} sn (en iyi {record['first_paint_seconds_min']:.3f} sn)")
+    print(f"  {'yeniden':<12} {record['rerun_seconds_median']:9.3f} sn")
+    print(f"  ağır modüller: {', '.join(record['heavy_modules_loaded']) or 'yok'}")
+    for error in record["errors"]:
+        print(f"  HATA: {error}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dönüştürme hattı performans ölçümü")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    def add_sheet_arguments(sub):
+        sub.add_argument("--products", type=int, default=3000, help="Ürün (satır) sayısı")
+        sub.add_argument("--stores", type=int, default=800, help="Mağaza sütunu sayısı")
+        sub.add_argument("--density", type=float, default=0.15, help="Dolu mağaza hücrelerinin oranı")
+        sub.add_argument("--text-ratio", type=float, default=0.05, help="Dolu hücrelerden metin olarak yazılanların oranı")
+        sub.add_argument("--suffixes", default="M=0.5,MM=0.3,=0.2", help="Mağaza soneki ağırlıkları")
+        sub.add_argument("--seed", type=int, default=0, help="Rastgelelik tohumu")
+    
+    run_parser = subparsers.add_parser("run", help="Aşama bazında ölçüm yap")
+    add_sheet_arguments(run_parser)
+    run_parser.add_argument("--threshold", type=int, default=DEFAULT_THRESHOLD, help="Minimum miktar eşiği")
+    run_parser.add_argument("--repeat", type=int, default=3, help="Süre ölçümü tekrar sayısı")
+    run_parser.add_argument("--no-memory", action="store_true", help="tracemalloc ile bellek ölçümünü atla")
+    run_parser.add_argument("--label", help="Kayda eklenecek serbest etiket")
+    run_parser.add_argument("-o", "--output", default="benchmark_results.jsonl", help="Sonuçların ekleneceği JSON satırları dosyası")
+    
+    generate_parser = subparsers.add_parser("generate", help="Sentetik sipariş dosyası yaz")
+    generate_parser.add_argument("path", help="Yazılacak .xlsx dosyası")
+    add_sheet_arguments(generate_parser)
+    
+    compare_parser = subparsers.add_parser("compare", help="İki sonuç dosyasını karşılaştır")
+    compare_parser.add_argument("base", help="Önceki sonuçlar")
+    compare_parser.add_argument("head", help="Sonraki sonuçlar")
+    
+    startup_parser = subparsers.add_parser("startup", help="Dosyasız ilk çizim süresini ve yüklenen modülleri ölç")
+    startup_parser.add_argument("--repeat", type=int, default=5, help="Ölçüm (süreç) sayısı")
+    startup_parser.add_argument("--budget", type=float, help="İlk çizim için saniye sınırı (aşılırsa 1 döner)")
+    startup_parser.add_argument("--label", help="Kayda eklenecek serbest etiket")
+    startup_parser.add_argument("-o", "--output", default="benchmark_results.jsonl", help="Sonuçların ekleneceği JSON satırları dosyası")
+    
+    args = parser.parse_args(argv)
+    if args.command == "compare":
+        return compare_results(args.base, args.head)
+    if args.command == "startup":
+        record = run_startup(args.repeat, args.label)
+        with open(args.output, "a", encoding="utf-8") as handle:
+            handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+        _print_startup(record)
+        over_budget = args.budget is not None and record["first_paint_seconds_median"] > args.budget
+        return 1 if record["heavy_modules_loaded"] or record["errors"] or over_budget else 0
+    
+    params = {
+        "products": args.products,
+        "stores": args.stores,
+        "density": args.density,
+        "text_ratio": args.text_ratio,
+        "suffix_mix": parse_suffix_mix(args.suffixes),
+        "seed": args.seed,
+    }
+    if args.command == "generate":
+        data = generate_order_sheet(**params)
+        with open(args.path, "wb") as handle:
+            handle.write(data)
+        print(f"{args.path}: {len(data) / 1024**2:.1f} MB")
+        return 0
+    
+    params["threshold"] = args.threshold
+    record = run_benchmark(params, args.repeat, not args.no_memory, args.label)
+    with open(args.output, "a", encoding="utf-8") as handle:
+        handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+    _print_record(record)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""Birden fazla müşteri dosyasını tek bir haftalık toplamda birleştirme
+
+Dosyalar paralel dönüştürülür; her dosyanın uzun tablosu işçide mağaza x ürün
+toplamlarına indirilir ve hemen bırakılır. Birleştirme, bu küçük parçaların tek
+bir sütunlu tabloda toplanmasıyla yapılır; N tam sonuç tablosu aynı anda
+bellekte tutulmaz.
+"""
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from converter import DEFAULT_THRESHOLD, STORE_PATTERN, convert_file
+
+# Dosya başına özet; pairs mağaza x ürün toplamlarıdır (birleştirmeden sonra None olur)
+FileSummary = namedtuple("FileSummary", ["name", "rows", "products", "stores", "quantity", "pairs", "descriptions", "error"])
+
+# Birleştirme sonucu: dosya özetleri, mağaza x ürün toplamları ve mağaza/ürün toplamları
+Consolidation = namedtuple("Consolidation", ["files", "pair_totals", "store_totals", "product_totals", "product_descriptions"])
+
+PAIR_COLUMNS = ["Mağaza Kodu2", "Kod"]
+
+def summarize_file(source, original_filename, threshold=DEFAULT_THRESHOLD, store_pattern=STORE_PATTERN):
+    """Tek dosyayı dönüştür ve mağaza x ürün toplamlarına indir (işçide çalışır)"""
+    try:
+        _, _, result = convert_file(source, original_filename, threshold, store_pattern)
+    except Exception as exc:
+        return FileSummary(original_filename, 0, 0, 0, 0, None, {}, f"{type(exc).__name__}: {exc}")
+    if result is None:
+        return FileSummary(original_filename, 0, 0, 0, 0, None, {}, "Mağaza sütunları bulunamadı")
+    
+    output_df, store_totals, product_count, _, (_, product_descriptions) = result
+    # Aynı ürün dosyada birden fazla satırda geçebilir; çift başına tek satıra indirilir
+    pairs = output_df.groupby(PAIR_COLUMNS, sort=False, observed=True)["Adet"].sum().astype(np.int64).reset_index()
+    return FileSummary(
+        original_filename, len(output_df), product_count, len(store_totals),
+        sum(store_totals.values()), pairs, product_descriptions, None
+    )
+
+def consolidate_files(sources, threshold=DEFAULT_THRESHOLD, store_pattern=STORE_PATTERN,
+                      max_workers=None, executor_class=ThreadPoolExecutor):
+    """(kaynak, dosya adı) çiftlerini paralel dönüştür ve toplamları birleştir
+    
+    executor_class olarak komut satırında ProcessPoolExecutor verilebilir;
+    kaynaklar bu durumda dosya yolu olmalıdır.
+    """
+    summaries = [None] * len(sources)
+    with executor_class(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(summarize_file, source, original_filename, threshold, store_pattern): pos
+            for pos, (source, original_filename) in enumerate(sources)
+        }
+        for future in as_completed(futures):
+            summaries[futures[future]] = future.result()
+    
+    parts = [summary.pairs for summary in summaries if summary.error is None]
+    product_descriptions = {}
+    for summary in summaries:
+        # Aynı ürün birden fazla dosyada geçerse sonraki dosyanın açıklaması geçerli
+        product_descriptions.update(summary.descriptions)
+    
+    if parts:
+        combined = pd.concat(parts, ignore_index=True)
+        pair_totals = combined.groupby(PAIR_COLUMNS, sort=False, observed=True).agg(
+            Adet=("Adet", "sum"), Dosya=("Adet", "size")
+        ).reset_index()
+    else:
+        pair_totals = pd.DataFrame({"Mağaza Kodu2": [], "Kod": [], "Adet": [], "Dosya": []})
+    pair_totals.insert(2, "MALZEME TANIMI", pair_totals["Kod"].map(product_descriptions).fillna(""))
+    
+    store_sums = pair_totals.groupby("Mağaza Kodu2", sort=False, observed=True)["Adet"].sum()
+    product_sums = pair_totals.groupby("Kod", sort=False, observed=True)["Adet"].sum()
+    files = [summary._replace(pairs=None, descriptions=None) for summary in summaries]
+    return Consolidation(
+        files,
+        pair_totals,
+        dict(zip(store_sums.index, store_sums.tolist())),
+        dict(zip(product_sums.index, product_sums.tolist())),
+        product_descriptions,
+    )
+
+def files_frame(consolidation):
+    """Dosya başına özet tablosu (arayüz ve çalışma kitabı için)"""
+    return pd.DataFrame([
+        {
+            "Dosya": summary.name,
+            "Çıktı Satırı": summary.rows,
+            "Ürün": summary.products,
+            "Mağaza": summary.stores,
+            "Toplam Miktar": summary.quantity,
+            "Hata": summary.error or "",
+        }
+        for summary in consolidation.files
+    ])
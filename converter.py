@@ -0,0 +1,478 @@
+"""Mağaza sipariş dönüştürme çekirdeği (Streamlit bağımlılığı yoktur)"""
+import hashlib
+import importlib.util
+import re
+import threading
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_float_dtype, is_integer_dtype, union_categoricals
+
+from defaults import DEFAULT_THRESHOLD, STORE_PATTERN
+from profiling import NULL_PROFILER
+
+# Mağaza kodu ve tipini ayıran desen (başlık başına bir kez çalışır)
+STORE_CODE_PATTERN = re.compile(r'^(\d{3,4})\s*([A-Za-z]*)$')
+
+# Başlıktaki bir mağaza sütunu: sütun adı, mağaza kodu, tipi ve başlıktaki konumu
+# (kod çıkarılamayan sütunlarda code None olur ve sütun dönüşüme alınmaz)
+StoreColumn = namedtuple("StoreColumn", ["column", "code", "store_type", "position"])
+
+# "Siparişler" çıktısının sütunları
+OUTPUT_COLUMNS = [
+    "Mağaza Kodu", "Tarih", "Mağaza Kodu2", "Mağaza Adı", "Artikel",
+    "Kod", "MALZEME TANIMI", "Adet", "Birim Fiyat", "TOPLAM TUTAR(TL)", "İlgili"
+]
+
+# Uzun tabloda bellekte tutulan sütunlar; metin sütunları kategoriktir (her değer
+# bir kez saklanır). Diğer çıktı sütunları hep boştur ve yalnızca dışa aktarırken eklenir.
+COMPACT_COLUMNS = ["Mağaza Kodu", "Mağaza Kodu2", "Kod", "MALZEME TANIMI", "Adet"]
+
+# Girdi dosyasında kullanılan ürün sütunları
+PRODUCT_CODE_COLUMN = "Hmk Kod"
+PRODUCT_DESCRIPTION_COLUMN = "Hmk Ürün Açıklama"
+
+# Mağaza sütunlarından sonra gelen, satırdaki toplam miktarı taşıyan sütun
+TOTAL_COLUMN = "TOPLAM"
+
+# python-calamine kuruluysa Excel çok daha hızlı (ve .xls dahil) okunur
+READ_ENGINE = "calamine" if importlib.util.find_spec("python_calamine") else "openpyxl"
+
+def clean_number(value, threshold=DEFAULT_THRESHOLD):
+    """Değerleri temizle ve tam sayıya dönüştür"""
+    if pd.isnull(value):
+        return 0
+    
+    # Excel'den gelen sayısal değerler
+    if isinstance(value, (int, float)):
+        return int(value) if value >= threshold else 0
+    
+    # Metin değerleri
+    value_str = str(value).strip()
+    if value_str in ['', '-', 'NaN', 'nan']:
+        return 0
+    
+    try:
+        value_str = value_str.replace(' ', '').replace(',', '.')
+        result = float(value_str)
+        return int(result) if result >= threshold else 0
+    except:
+        return 0
+
+@lru_cache(maxsize=128)
+def _parse_header(columns, pattern):
+    """Başlıktaki mağaza sütunlarını çöz (aynı başlık imzası için önbellekten döner)"""
+    store_pattern = re.compile(pattern)
+    
+    store_cols = []
+    store_start_idx = None
+    store_end_idx = None
+    
+    for idx, col in enumerate(columns):
+        col_str = str(col).strip()
+        if store_pattern.match(col_str):
+            if store_start_idx is None:
+                store_start_idx = idx
+            code_match = STORE_CODE_PATTERN.match(str(col))
+            type_match = STORE_CODE_PATTERN.match(col_str)
+            store_type = (type_match.group(2).upper() or "NO_SUFFIX") if type_match else None
+            store_cols.append(StoreColumn(col, code_match.group(1) if code_match else None, store_type, idx))
+        elif col == TOTAL_COLUMN and store_start_idx is not None:
+            store_end_idx = idx
+            break
+    
+    return tuple(store_cols), store_start_idx, store_end_idx
+
+def find_store_columns(df, pattern=STORE_PATTERN):
+    """Mağaza sütunlarını dinamik olarak bul (StoreColumn listesi, başlangıç ve TOPLAM konumu)"""
+    return _parse_header(tuple(df.columns), pattern)
+
+def find_store_types(store_cols):
+    """Bulunan store tiplerini çıkar (büyük harfe çevir)"""
+    return sorted({col.store_type for col in store_cols if col.store_type is not None})
+
+def _parse_float(text):
+    try:
+        return float(text)
+    except ValueError:
+        return np.nan
+
+def parse_values(values):
+    """Değerleri float64 diziye çevir (clean_values'un kırpma ve eşik öncesi hali)
+    
+    Metinlerdeki boşluklar atılır ve virgül ondalık ayracı sayılır; "-", boş
+    ve sayıya çevrilemeyen değerler NaN olur.
+    """
+    series = pd.Series(values, dtype=object)
+    is_text = series.map(lambda value: isinstance(value, str)).to_numpy(dtype=bool)
+    numbers = np.full(len(series), np.nan)
+    
+    if is_text.any():
+        normalized = series[is_text].str.strip().str.replace(" ", "", regex=False).str.replace(",", ".", regex=False)
+        parsed = pd.to_numeric(normalized, errors="coerce").to_numpy(dtype=np.float64, copy=True)
+        # to_numeric'in tanımadığı ama float()'un kabul ettiği nadir biçimler ("1_000" gibi)
+        unparsed = np.isnan(parsed) & ~normalized.isin(["", "-", "NaN", "nan"]).to_numpy(dtype=bool)
+        if unparsed.any():
+            parsed[unparsed] = [_parse_float(text) for text in normalized[unparsed]]
+        numbers[is_text] = parsed
+    if not is_text.all():
+        numbers[~is_text] = pd.to_numeric(series[~is_text], errors="coerce").to_numpy(dtype=np.float64)
+    return numbers
+
+def clean_values(values, threshold=DEFAULT_THRESHOLD):
+    """Değerleri toplu temizle (clean_number ile aynı kurallar, int64 dizi döner)
+    
+    Sayıya çevrilemeyen değerler ile eşiğin altındakiler 0 olur; ondalıklar atılır.
+    """
+    numbers = parse_values(values)
+    result = np.zeros(len(numbers), dtype=np.int64)
+    valid = np.isfinite(numbers) & (numbers >= threshold)
+    result[valid] = numbers[valid].astype(np.int64)
+    return result
+
+def quantity_dtype(low, high):
+    """Değer aralığına sığan en küçük miktar tipi (negatif yoksa işaretsiz)"""
+    for dtype in ((np.uint16, np.uint32) if low >= 0 else (np.int32,)):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+def _widen(values, numbers):
+    """Matris tipini yeni değerler sığacak şekilde gerekirse genişlet"""
+    if len(numbers) == 0:
+        return values
+    dtype = np.promote_types(values.dtype, quantity_dtype(numbers.min(), numbers.max()))
+    return values if dtype == values.dtype else values.astype(dtype)
+
+def clean_store_block(block, threshold=DEFAULT_THRESHOLD):
+    """Mağaza bloğunu tek geçişte temizle (clean_number ile aynı kurallar)
+    
+    Sonuç, değerlerin sığdığı en küçük tam sayı tipindedir (çoğunlukla uint16).
+    """
+    values = np.zeros(block.shape, dtype=np.uint16)
+    object_positions = []
+    
+    # Sütun tipleri bir kez okunur; metin/karışık sütunlara tek tek erişilmez
+    for pos, dtype in enumerate(block.dtypes):
+        if is_integer_dtype(dtype) or is_bool_dtype(dtype):
+            numbers = block.iloc[:, pos].to_numpy(dtype=np.int64, na_value=0)
+            numbers = np.where(numbers >= threshold, numbers, 0)
+        elif is_float_dtype(dtype):
+            numbers = block.iloc[:, pos].to_numpy(dtype=np.float64, na_value=np.nan)
+            valid = np.isfinite(numbers) & (numbers >= threshold)
+            numbers = np.where(valid, numbers, 0).astype(np.int64)
+        else:
+            object_positions.append(pos)
+            continue
+        values = _widen(values, numbers)
+        values[:, pos] = numbers
+    
+    # Metin/karışık sütunlar: her benzersiz değer yalnızca bir kez temizlenir
+    if object_positions:
+        cells = block.iloc[:, object_positions].to_numpy(dtype=object)
+        codes, uniques = pd.factorize(cells.ravel())
+        # Son eleman boş hücreler (-1 kodu) için 0 değerini taşır
+        lookup = np.append(clean_values(uniques, threshold), 0)
+        values = _widen(values, lookup)
+        values[:, object_positions] = lookup.astype(values.dtype)[codes].reshape(cells.shape)
+    
+    return values
+
+def _integral(value):
+    return int(value) if value.is_integer() else value
+
+def text_column(column):
+    """Kod/açıklama sütununu metne çevir (boş hücreler NaN kalır)
+    
+    Boş hücre içeren sayısal sütunlar float64 okunur; calamine boşluklu metin
+    hücrelerini de boş okur. Tam sayı değerli float'lar int olarak yazılır, kodlar
+    okuyucudan ve parçadan bağımsız olarak "12345.0" değil "12345" olur.
+    """
+    if is_float_dtype(column.dtype):
+        # map sonucu yeniden float64'e çıkarsanmasın diye object dizi elle kurulur
+        values = column.to_numpy()
+        column = pd.Series(
+            np.array([value if value != value else _integral(value) for value in values.tolist()], dtype=object),
+            index=column.index, dtype=object
+        )
+    return column.map(str, na_action='ignore')
+
+def prepare_products(df):
+    """Ürün kodu olan satırları, kod/açıklama metinlerini ve açıklama sözlüğünü hazırla"""
+    if PRODUCT_CODE_COLUMN in df.columns:
+        kod_text = text_column(df[PRODUCT_CODE_COLUMN])
+    else:
+        kod_text = pd.Series(np.nan, index=df.index, dtype=object)
+    product_mask = kod_text.fillna('').astype(str).str.strip().ne('').to_numpy(dtype=bool)
+    kod_text = kod_text[product_mask]
+    
+    # Ürün açıklamaları (aynı kod tekrar ederse son açıklama geçerli)
+    if PRODUCT_DESCRIPTION_COLUMN in df.columns:
+        description_text = text_column(df[PRODUCT_DESCRIPTION_COLUMN][product_mask])
+        # Yalnızca boşluktan oluşan açıklamalar her iki okuyucuda da boş sayılır
+        blank = [isinstance(value, str) and not value.strip() for value in description_text.tolist()]
+        description_text = description_text.mask(np.array(blank, dtype=bool))
+    else:
+        description_text = pd.Series("", index=kod_text.index, dtype=object)
+    has_description = description_text.notna()
+    product_descriptions = dict(zip(kod_text[has_description], description_text[has_description]))
+    
+    return product_mask, kod_text, description_text, product_descriptions
+
+def store_code_columns(store_cols):
+    """Mağaza kodu çıkarılabilen sütunları ve kodlarını döndür"""
+    code_cols = [col for col in store_cols if col.code is not None]
+    return [col.column for col in code_cols], [col.code for col in code_cols]
+
+def needed_positions(columns, store_cols):
+    """Yüklenecek sütunların başlıktaki konumları (ürün ve mağaza sütunları)"""
+    positions = {col.position for col in store_cols}
+    positions.update(
+        pos for pos, col in enumerate(columns) if col in (PRODUCT_CODE_COLUMN, PRODUCT_DESCRIPTION_COLUMN)
+    )
+    return sorted(positions)
+
+def constant_column(value, length):
+    """Tek değerli kategorik sütun (satır başına bir bayt)"""
+    return pd.Categorical.from_codes(np.zeros(length, dtype=np.int8), [value])
+
+def _encoded(values, positions):
+    """Değerleri bir kez kodla, satırları kod üzerinden kategorik olarak seç"""
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    return pd.Categorical.from_codes(codes[positions], uniques)
+
+def melt_quantities(quantities, kod_text, description_text, store_codes, magaza_kodu):
+    """Temizlenmiş miktar matrisini satır sırasıyla kompakt uzun formata aç"""
+    row_idx, col_idx = np.nonzero(quantities > 0)
+    return pd.DataFrame({
+        "Mağaza Kodu": constant_column(magaza_kodu, len(row_idx)),
+        "Mağaza Kodu2": _encoded(store_codes, col_idx),
+        "Kod": _encoded(kod_text, row_idx),
+        "MALZEME TANIMI": _encoded(description_text.fillna(""), row_idx),
+        "Adet": quantities[row_idx, col_idx],
+    }, index=pd.RangeIndex(len(row_idx)))
+
+def output_frame(output_df):
+    """Kompakt uzun tabloyu boş sütunlarıyla birlikte "Siparişler" düzeninde döndür"""
+    return pd.DataFrame(
+        {name: output_df[name] if name in output_df else "" for name in OUTPUT_COLUMNS},
+        index=output_df.index
+    )
+
+def concat_outputs(frames):
+    """Uzun tablo parçalarını kategorik sütunların sözlüklerini birleştirerek art arda ekle"""
+    # Boş parçaların kategori türü farklı olabilir (object); birleştirmeye katılmaz
+    frames = [frame for frame in frames if len(frame)] or frames[:1]
+    columns = {}
+    for name in frames[0].columns:
+        parts = [frame[name] for frame in frames]
+        if isinstance(parts[0].dtype, pd.CategoricalDtype):
+            columns[name] = union_categoricals(parts, ignore_order=True)
+        else:
+            columns[name] = np.concatenate([part.to_numpy() for part in parts])
+    return pd.DataFrame(columns)
+
+def aggregate_totals(output_df):
+    """Mağaza ve ürün toplamları (ilk görülme sırası korunur)"""
+    store_sums = output_df.groupby("Mağaza Kodu2", sort=False, observed=True)["Adet"].sum()
+    product_sums = output_df.groupby("Kod", sort=False, observed=True)["Adet"].sum()
+    store_totals = dict(zip(store_sums.index, store_sums.tolist()))
+    product_totals = dict(zip(product_sums.index, product_sums.tolist()))
+    return store_totals, product_totals
+
+def convert_frame(df, store_cols, magaza_kodu, threshold=DEFAULT_THRESHOLD, profiler=NULL_PROFILER):
+    """Geniş sipariş tablosunu tek geçişte uzun formata dönüştür"""
+    # Temizle, eşiği maske olarak uygula ve satır sırasıyla uzun formata aç
+    with profiler.stage("clean", rows_in=len(df)) as stage:
+        code_cols, store_codes = store_code_columns(store_cols)
+        product_mask, kod_text, description_text, product_descriptions = prepare_products(df)
+        quantities = clean_store_block(df.loc[product_mask, code_cols], threshold)
+        stage["rows_out"] = len(quantities)
+    with profiler.stage("reshape", rows_in=len(quantities)) as stage:
+        output_df = melt_quantities(quantities, kod_text, description_text, store_codes, magaza_kodu)
+        stage["rows_out"] = len(output_df)
+    with profiler.stage("aggregate", rows_in=len(output_df)) as stage:
+        store_totals, product_totals = aggregate_totals(output_df)
+        stage["rows_out"] = len(store_totals) + len(product_totals)
+    
+    return output_df, store_totals, int(product_mask.sum()), product_totals, product_descriptions
+
+class RowIndex:
+    """Bir sütunun değerinden satır konumlarına sıralı indeks
+    
+    Satırlar değere göre kararlı sıralanıp her değerin başlangıç konumu
+    saklanır; bir sorgu yalnızca eşleşen satır sayısı kadar iş yapar ve
+    satırlar tablodaki sırasıyla döner.
+    """
+    
+    def __init__(self, values):
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Kategorik sütunun kodları doğrudan kullanılır; kullanılmayan kategoriler atlanır
+            codes, uniques = values.cat.codes.to_numpy().astype(np.intp), values.cat.categories
+        else:
+            codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        self._order = np.argsort(codes, kind="stable")[len(codes) - counts.sum():]
+        self._offsets = np.concatenate(([0], np.cumsum(counts)))
+        self._slots = {value: slot for slot, value in enumerate(uniques) if counts[slot]}
+    
+    def rows(self, value):
+        """Değerin geçtiği satırların konumları (yoksa boş dizi)"""
+        slot = self._slots.get(value)
+        if slot is None:
+            return self._order[:0]
+        return self._order[self._offsets[slot]:self._offsets[slot + 1]]
+    
+    def __contains__(self, value):
+        return value in self._slots
+    
+    @property
+    def nbytes(self):
+        # Sözlük kayıtları için kaba bir kayıt başı ek yük
+        return self._order.nbytes + self._offsets.nbytes + 200 * len(self._slots)
+
+# Mağaza ve ürün sorguları için dönüşüm başına bir kez oluşturulan indeksler
+LookupIndex = namedtuple("LookupIndex", ["stores", "products"])
+
+def build_lookup_index(output_df):
+    """Uzun tablo için mağaza kodu ve ürün kodu indekslerini oluştur"""
+    return LookupIndex(RowIndex(output_df["Mağaza Kodu2"]), RowIndex(output_df["Kod"]))
+
+class ResultCache:
+    """Dönüşüm ve dışa aktarma sonuçları için boyut sınırlı LRU önbellek"""
+    
+    def __init__(self, max_entries=8, max_bytes=512 * 1024**2):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        # İndirme callback'leri ayrı bir thread'de çalışır
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def make_key(data, original_filename, threshold, store_pattern, extra=()):
+        """Dosya içeriği ve dönüşüm parametrelerinden anahtar üret
+        
+        extra, sonucu etkileyen diğer girdilerdir (örn. referans dosyalarının imzası).
+        """
+        return (hashlib.sha256(data).hexdigest(), original_filename, threshold, store_pattern, *extra)
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+    
+    def put(self, key, value, nbytes):
+        with self._lock:
+            if key in self._entries:
+                self.total_bytes -= self._entries.pop(key)[1]
+            # Tek başına sınırı aşan sonuçlar önbelleğe alınmaz
+            if nbytes > self.max_bytes:
+                return
+            self._entries[key] = (value, nbytes)
+            self.total_bytes += nbytes
+            # En uzun süredir kullanılmayan kayıtları çıkar
+            while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_bytes
+    
+    def __len__(self):
+        return len(self._entries)
+
+def conversion_nbytes(conversion):
+    """Önbellek sınırı için dönüşüm sonucunun yaklaşık bellek boyutu"""
+    store_cols, column_preview, result = conversion
+    if result is None:
+        return 1024
+    result_df, store_totals, _, _, (product_totals, product_descriptions) = result
+    text_bytes = sum(len(kod) + len(aciklama) for kod, aciklama in product_descriptions.items())
+    # Sözlük kayıtları için kaba bir kayıt başı ek yük
+    entry_bytes = 200 * (len(store_totals) + len(product_totals) + len(product_descriptions))
+    return int(result_df.memory_usage(deep=True).sum()) + text_bytes + entry_bytes
+
+class OrderFileError(ValueError):
+    """Yüklenen dosya Excel çalışma kitabı olarak okunamadı (bozuk, şifreli veya başka biçimde)"""
+
+def _read_excel(file_buffer, engine, **kwargs):
+    """pd.read_excel; okuma motorunun dosyadan kaynaklanan hataları OrderFileError olarak döner"""
+    try:
+        return pd.read_excel(file_buffer, engine=engine, **kwargs)
+    except MemoryError:
+        raise
+    except Exception as exc:
+        raise OrderFileError(f"Çalışma kitabı okunamadı: {type(exc).__name__}: {exc}") from exc
+
+def _rewind(file_buffer):
+    if hasattr(file_buffer, "seek"):
+        file_buffer.seek(0)
+
+def read_order_file(file_buffer, store_pattern=STORE_PATTERN, engine=READ_ENGINE, profiler=NULL_PROFILER):
+    """Başlığı oku, yalnızca ürün, mağaza ve TOPLAM sütunlarını döndür
+    
+    calamine usecols verilse de sayfanın tamamını ayrıştırır; bu yüzden sayfa
+    bir kez okunur ("read"), sütunlar başlık çözüldükten sonra seçilir
+    ("detect"). openpyxl'de önce yalnızca başlık okunup çözülür ("detect"),
+    ardından gereken sütunlar yüklenir ("read").
+    """
+    sheet = None
+    if engine == "calamine":
+        with profiler.stage("read") as stage:
+            sheet = _read_excel(file_buffer, engine)
+            stage["rows_out"] = len(sheet)
+    
+    with profiler.stage("detect") as stage:
+        header = sheet.iloc[:0] if sheet is not None else _read_excel(file_buffer, engine, nrows=0)
+        stage["rows_in"] = len(header.columns)
+        
+        # Mağaza sütunlarını dinamik olarak bul
+        store_cols, store_start_idx, store_end_idx = find_store_columns(header, store_pattern)
+        stage["rows_out"] = len(store_cols)
+        if not store_cols:
+            return header, store_cols
+        
+        # Sütunlar konumla seçilir; TOPLAM yalnızca mutabakat için tutulur, diğer sütunlar atılır
+        positions = needed_positions(header.columns, store_cols)
+        if store_end_idx is not None:
+            positions.append(store_end_idx)
+        if sheet is not None:
+            return sheet.iloc[:, sorted(positions)], store_cols
+    
+    with profiler.stage("read") as stage:
+        _rewind(file_buffer)
+        df = _read_excel(file_buffer, engine, usecols=positions)
+        stage["rows_out"] = len(df)
+    return df, store_cols
+
+def cached_read_order_file(cache, digest, file_buffer, store_pattern=STORE_PATTERN, profiler=NULL_PROFILER):
+    """read_order_file sonucunu dosya özetiyle önbellekten döndür
+    
+    Okunan tablo eşikten ve referans verisinden bağımsızdır; aynı dosya farklı
+    eşikle veya yeniden yüklendiğinde çalışma kitabı tekrar ayrıştırılmaz.
+    Dönüştürme adımları tabloyu değiştirmez, oturumlar arasında paylaşılabilir.
+    """
+    key = (digest, store_pattern)
+    cached = cache.get(key)
+    if cached is None:
+        cached = read_order_file(file_buffer, store_pattern, profiler=profiler)
+        cache.put(key, cached, int(cached[0].memory_usage(deep=True).sum()))
+    return cached
+
+def convert_order(df, store_cols, original_filename, threshold=DEFAULT_THRESHOLD, profiler=NULL_PROFILER):
+    """Okunmuş sipariş tablosunu dönüştür ve convert_file sonuç biçiminde döndür"""
+    output_df, store_totals, product_count, product_totals, product_descriptions = convert_frame(
+        df, store_cols, original_filename.rsplit('.', 1)[0], threshold, profiler
+    )
+    return output_df, store_totals, product_count, len(store_cols), (product_totals, product_descriptions)
+
+def convert_file(file_buffer, original_filename, threshold=DEFAULT_THRESHOLD, store_pattern=STORE_PATTERN, profiler=NULL_PROFILER):
+    """Excel dosyasını oku ve dönüştür (arayüz çıktısı üretmez)"""
+    df, store_cols = read_order_file(file_buffer, store_pattern, profiler=profiler)
+    if not store_cols:
+        return store_cols, list(df.columns[:20]), None
+    return store_cols, list(df.columns[:20]), convert_order(df, store_cols, original_filename, threshold, profiler)
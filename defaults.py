@@ -0,0 +1,26 @@
+"""Arayüzün açılışta ihtiyaç duyduğu varsayılanlar
+
+Bu modül pandas, numpy, openpyxl veya pyarrow içe aktarmaz: uygulama ilk ekranı
+ve kenar çubuğunu bu değerlerle çizer, dönüştürme modülleri ancak bir dosya
+işlenirken yüklenir. converter ve exporter bu adları aynen dışa verir.
+"""
+import importlib.util
+
+# Çok daha esnek pattern: 3-4 haneli sayı + opsiyonel harf kombinasyonu (büyük/küçük)
+# Bu pattern gelecekte yeni store tipleri eklendiğinde de çalışacak
+STORE_PATTERN = r'^\d{3,4}\s*[A-Za-z]*$'
+
+# Bu miktarın altındaki siparişler çıktıya alınmaz
+DEFAULT_THRESHOLD = 10
+
+# pyarrow kuruluysa Parquet çıktısı sunulur
+PARQUET_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+# Arayüzdeki format adı -> dosya uzantısı
+EXPORT_FORMATS = {
+    "Excel (.xlsx)": "xlsx",
+    "CSV (.csv)": "csv",
+    "CSV, sıkıştırılmış (.csv.gz)": "csv.gz",
+}
+if PARQUET_AVAILABLE:
+    EXPORT_FORMATS["Parquet (.parquet)"] = "parquet"
@@ -0,0 +1,189 @@
+"""TOPLAM mutabakatı ve mağaza/fiyat ana verisiyle zenginleştirme
+
+Dönüşümden sonra çalışır. Mağaza bloğunun satır toplamları dosyadaki TOPLAM
+sütunuyla tek vektörel geçişte karşılaştırılır; tutmayan ürünler raporlanır.
+Yerel referans dosyalarındaki (mağaza listesi, fiyat listesi) mağaza adları ve
+birim fiyatlar dosya başına bir kez okunup anahtar indeksine çevrilir; uzun
+tabloya satır satır değil, kategorik sütunların sözlükleri üzerinden toplu
+olarak eklenir. TOPLAM TUTAR sütun bazında Adet × Birim Fiyat olarak hesaplanır.
+"""
+import os
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+from converter import (
+    DEFAULT_THRESHOLD, STORE_PATTERN, TOTAL_COLUMN, cached_read_order_file, convert_order, parse_values,
+    prepare_products, read_order_file, store_code_columns
+)
+from incremental import revise_order
+from profiling import NULL_PROFILER
+
+# Ortam değişkeniyle verilen referans dosyaları uygulamada, HTTP servisinde ve
+# toplu dönüştürmede varsayılan olarak kullanılır (.xlsx, .xls veya .csv)
+STORE_MASTER_PATH = os.environ.get("SIPARIS_STORE_MASTER")
+PRICE_LIST_PATH = os.environ.get("SIPARIS_PRICE_LIST")
+
+# Referans dosyalarında aranan (anahtar, değer) sütunları
+STORE_MASTER_COLUMNS = ("Mağaza Kodu", "Mağaza Adı")
+PRICE_LIST_COLUMNS = ("Kod", "Birim Fiyat")
+
+# Mutabakat raporunun sütunları
+MISMATCH_COLUMNS = ["Kod", "MALZEME TANIMI", "Mağaza Toplamı", "TOPLAM", "Fark"]
+
+# Ondalıklı toplamlardaki kayan nokta hatası bu farkın altında sayılmaz
+RECONCILE_TOLERANCE = 1e-6
+
+# TOPLAM mutabakatı: kontrol edilen ürün satırı sayısı ve TOPLAM'ı tutmayan satırlar
+Reconciliation = namedtuple("Reconciliation", ["checked", "mismatches"])
+
+# Yüklenmiş referans verisi: anahtar -> değer serileri (yoksa None) ve önbellek
+# anahtarlarına eklenen dosya imzası
+ReferenceData = namedtuple("ReferenceData", ["stores", "prices", "signature"])
+
+NO_REFERENCE = ReferenceData(None, None, ())
+
+def _finite(numbers):
+    """Boş ve sayıya çevrilemeyen (NaN/sonsuz) değerleri 0 say"""
+    return np.where(np.isfinite(numbers), numbers, 0.0)
+
+def _parse_block(block):
+    """Mağaza bloğunu kırpmadan float64 matrise çevir (sayısal sütunlar doğrudan alınır)"""
+    values = np.zeros(block.shape, dtype=np.float64)
+    for pos, dtype in enumerate(block.dtypes):
+        column = block.iloc[:, pos]
+        if is_numeric_dtype(dtype):
+            values[:, pos] = column.to_numpy(dtype=np.float64, na_value=np.nan)
+        else:
+            values[:, pos] = parse_values(column.to_numpy(dtype=object))
+    return _finite(values)
+
+def reconcile_totals(df, store_cols, profiler=NULL_PROFILER):
+    """Mağaza bloğunun satır toplamlarını TOPLAM sütunuyla tek geçişte karşılaştır
+    
+    Hücreler eşik, ondalık kırpma ve negatif sıfırlama uygulanmadan okunur;
+    dosyadaki değerler olduğu gibi toplanır ve RECONCILE_TOLERANCE içindeki
+    farklar tutmuş sayılır. Dosyada TOPLAM sütunu yoksa None döner.
+    """
+    if TOTAL_COLUMN not in df.columns:
+        return None
+    with profiler.stage("reconcile", rows_in=len(df)) as stage:
+        product_mask, kod_text, description_text, _ = prepare_products(df)
+        code_cols, _ = store_code_columns(store_cols)
+        row_sums = _parse_block(df.loc[product_mask, code_cols]).sum(axis=1)
+        totals = _finite(parse_values(df[TOTAL_COLUMN].to_numpy()[product_mask]))
+        mismatched = np.flatnonzero(np.abs(row_sums - totals) > RECONCILE_TOLERANCE)
+        mismatches = pd.DataFrame({
+            "Kod": kod_text.to_numpy()[mismatched],
+            "MALZEME TANIMI": description_text.fillna("").to_numpy()[mismatched],
+            "Mağaza Toplamı": row_sums[mismatched],
+            "TOPLAM": totals[mismatched],
+            "Fark": row_sums[mismatched] - totals[mismatched],
+        }, columns=MISMATCH_COLUMNS)
+        stage["rows_out"] = len(mismatches)
+    return Reconciliation(len(row_sums), mismatches)
+
+def _read_table(path):
+    """Referans dosyasını metin olarak oku (kodların baştaki sıfırları korunur)"""
+    if path.lower().endswith(".csv"):
+        return pd.read_csv(path, dtype=str, sep=None, engine="python", encoding="utf-8-sig")
+    return pd.read_excel(path, dtype=str)
+
+@lru_cache(maxsize=8)
+def _load_index(path, columns, numeric, mtime_ns, size):
+    """Referans dosyasını anahtar -> değer serisine çevir (dosya değişene kadar önbellekten döner)"""
+    key_column, value_column = columns
+    table = _read_table(path)
+    missing = [name for name in columns if name not in table.columns]
+    if missing:
+        raise ValueError(f"{os.path.basename(path)} dosyasında sütun bulunamadı: {', '.join(missing)}")
+    keys = table[key_column].str.strip()
+    values = table[value_column]
+    if numeric:
+        # Fiyatlarda virgül ondalık ayracı olabilir; boşluklar atılır
+        values = values.str.strip().str.replace(" ", "", regex=False).str.replace(",", ".", regex=False)
+        values = pd.to_numeric(values, errors="coerce")
+    else:
+        values = values.str.strip()
+    # Aynı kod tekrar ederse son kayıt geçerli; indeks benzersiz olunca aramalar karma tablodan yapılır
+    present = keys.notna() & keys.ne("")
+    index = pd.Series(values[present].to_numpy(), index=pd.Index(keys[present].to_numpy(), dtype=object))
+    return index[~index.index.duplicated(keep="last")]
+
+def _reference_index(path, columns, numeric=False):
+    """(seri, imza) döndür; dosya verilmemişse (None, ())"""
+    if not path:
+        return None, ()
+    stat = os.stat(path)
+    return _load_index(path, columns, numeric, stat.st_mtime_ns, stat.st_size), (path, stat.st_mtime_ns, stat.st_size)
+
+def load_reference_data(store_path=STORE_MASTER_PATH, price_path=PRICE_LIST_PATH):
+    """Mağaza listesi ve fiyat listesini yükle (her dosya değişene kadar bir kez okunur)"""
+    stores, store_signature = _reference_index(store_path, STORE_MASTER_COLUMNS)
+    prices, price_signature = _reference_index(price_path, PRICE_LIST_COLUMNS, numeric=True)
+    if stores is None and prices is None:
+        return NO_REFERENCE
+    return ReferenceData(stores, prices, ("reference", store_signature, price_signature))
+
+def _joined(column, index):
+    """Kategorik sütunun her değerini indekste bir kez ara; (değer dizisi, satır kodları) döndür"""
+    categorical = column.array if isinstance(column.dtype, pd.CategoricalDtype) else pd.Categorical(column)
+    positions = index.index.get_indexer(categorical.categories.astype(str))
+    values = np.append(index.to_numpy(), np.nan)[positions]
+    return values, categorical.codes
+
+def enrich_output(output_df, reference):
+    """Uzun tabloya Mağaza Adı, Birim Fiyat ve TOPLAM TUTAR(TL) sütunlarını ekle
+    
+    Referansta bulunmayan mağaza ve ürünlerde değer boş kalır. Tablo
+    değiştirilmez, sütunları eklenmiş yeni bir tablo döner.
+    """
+    columns = {}
+    if reference.stores is not None:
+        names, codes = _joined(output_df["Mağaza Kodu2"], reference.stores)
+        name_codes, name_values = pd.factorize(names)
+        columns["Mağaza Adı"] = pd.Categorical.from_codes(name_codes[codes], name_values)
+    if reference.prices is not None:
+        prices, codes = _joined(output_df["Kod"], reference.prices)
+        unit_prices = prices.astype(np.float64)[codes]
+        columns["Birim Fiyat"] = unit_prices
+        columns["TOPLAM TUTAR(TL)"] = output_df["Adet"].to_numpy() * unit_prices
+    if not columns:
+        return output_df
+    return output_df.assign(**columns)
+
+def enrich_result(result, reference, profiler=NULL_PROFILER):
+    """convert_file sonucunun uzun tablosunu zenginleştir (toplamlar değişmez)"""
+    if result is None or not reference.signature:
+        return result
+    output_df, *rest = result
+    with profiler.stage("enrich", rows_in=len(output_df)) as stage:
+        output_df = enrich_output(output_df, reference)
+        stage["rows_out"] = len(output_df)
+    return (output_df, *rest)
+
+def convert_checked(file_buffer, original_filename, threshold=DEFAULT_THRESHOLD, store_pattern=STORE_PATTERN,
+                    snapshots=None, reference=NO_REFERENCE, profiler=NULL_PROFILER, frames=None, digest=None):
+    """Dosyayı dönüştür, TOPLAM mutabakatını yap ve sonucu referans verisiyle zenginleştir
+    
+    ((store_cols, column_preview, sonuç), farklar, mutabakat) döndürür. snapshots
+    verilirse dönüşüm convert_file_revision gibi artımlıdır; verilmezse farklar None olur.
+    frames (okunan tablolar önbelleği) ve digest (dosya özeti) verilirse çalışma
+    kitabı aynı dosya için yalnızca bir kez okunur.
+    """
+    if frames is not None:
+        df, store_cols = cached_read_order_file(frames, digest, file_buffer, store_pattern, profiler)
+    else:
+        df, store_cols = read_order_file(file_buffer, store_pattern, profiler=profiler)
+    if not store_cols:
+        return (store_cols, list(df.columns[:20]), None), None, None
+    
+    if snapshots is not None:
+        result, diff = revise_order(df, store_cols, original_filename, snapshots, threshold, profiler)
+    else:
+        result, diff = convert_order(df, store_cols, original_filename, threshold, profiler), None
+    reconciliation = reconcile_totals(df, store_cols, profiler)
+    return (store_cols, list(df.columns[:20]), enrich_result(result, reference, profiler)), diff, reconciliation
@@ -0,0 +1,350 @@
+"""Dönüştürülmüş siparişlerin dışa aktarımı
+
+Excel tek çalışma kitabı olarak yazılır. CSV, sıkıştırılmış CSV ve Parquet
+biçimlerinde her sayfa ayrı bir dosyadır; hepsi tek bir zip içinde indirilir.
+Ana tablo parça parça yazılır, tüm dosya metni bellekte oluşturulmaz.
+
+Mağaza bazında bölünmüş çıktıda satırlar bir kez mağazaya göre gruplanır, her
+mağazanın dosyası bir işçi havuzunda yazılır ve biten dosyalar sırayla zip'e
+eklenir; aynı anda yalnızca birkaç dosya bellekte tutulur. Uygulamada zip geçici
+bir dosyaya yazılır ve önbellekte yalnızca dosya süreleri saklanır.
+"""
+import gzip
+import io
+import os
+import re
+import tempfile
+import time
+import zipfile
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from io import BytesIO
+from itertools import repeat
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+from pandas.api.types import is_numeric_dtype
+
+from converter import OUTPUT_COLUMNS, output_frame
+from defaults import EXPORT_FORMATS, PARQUET_AVAILABLE
+from profiling import NULL_PROFILER
+from summary import build_summary
+
+# pyarrow kuruluysa Parquet çıktısı sunulur (formatlar defaults modülünde)
+if PARQUET_AVAILABLE:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+# Türkçe bölgesel ayarlı Excel ve ERP içe aktarımları noktalı virgül ayırıcı bekler
+CSV_SEPARATOR = ";"
+
+# BOM, Excel'in ve ERP'nin dosyayı UTF-8 olarak tanımasını sağlar (Ş, İ, Ğ bozulmaz)
+CSV_ENCODING = "utf-8-sig"
+
+# Ana tablo bu kadar satırlık parçalar halinde yazılır (Parquet'te satır grubu boyutu)
+EXPORT_CHUNK_ROWS = 50_000
+
+# Bölünmüş çıktıda zip'e eklenmeyi bekleyebilecek dosya sayısı (işçi başına)
+SPLIT_PENDING_PER_WORKER = 2
+
+# Bölünmüş çıktıdaki bir dosya: zip içindeki adı, satır sayısı, boyutu ve yazma süresi
+SplitFile = namedtuple("SplitFile", ["name", "rows", "nbytes", "seconds"])
+
+def _header_cell(sheet, value):
+    """pandas başlık biçimine uygun kalın, kenarlıklı başlık hücresi"""
+    cell = WriteOnlyCell(sheet, value=value)
+    thin = Side(style="thin")
+    cell.font = Font(bold=True)
+    cell.border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    cell.alignment = Alignment(horizontal="center", vertical="top")
+    return cell
+
+def frame_rows(df, columns=None):
+    """DataFrame satırlarını sütun listelerinden üret (tamamen boş sütunlar hücre yazmaz)
+    
+    columns verilirse satırlar bu sütun sırasıyla üretilir; df'de olmayan
+    sütunlar (kompakt uzun tablonun boş sütunları) ve eksik değerler (referansta
+    bulunmayan mağaza adı/fiyat) boş hücre olarak yazılır.
+    """
+    values = []
+    for name in (df.columns if columns is None else columns):
+        if name not in df:
+            values.append(repeat(None, len(df)))
+            continue
+        column = df[name]
+        if not is_numeric_dtype(column) and column.eq("").all():
+            values.append(repeat(None, len(df)))
+        elif column.hasnans:
+            values.append(column.astype(object).where(column.notna(), None).tolist())
+        else:
+            values.append(column.tolist())
+    return zip(*values)
+
+def start_sheet(workbook, title, columns):
+    """Write-only sayfa oluştur ve başlık satırını yaz"""
+    sheet = workbook.create_sheet(title)
+    sheet.append([_header_cell(sheet, name) for name in columns])
+    return sheet
+
+def _write_sheet(workbook, title, columns, rows):
+    """Write-only sayfaya başlık ve satırları akış halinde yaz"""
+    sheet = start_sheet(workbook, title, columns)
+    for row in rows:
+        sheet.append(row)
+
+def build_excel_export(result, include_summary=True, include_product_sheet=True, summary=None):
+    """Çok sayfalı Excel çıktısını write-only modda oluştur
+    
+    summary (build_summary) verilirse sıralı toplamlar yeniden hesaplanmaz.
+    """
+    result_df, store_totals, product_count, _, (product_totals, product_descriptions) = result
+    workbook = Workbook(write_only=True)
+    
+    # Ana veriyi yaz
+    _write_sheet(workbook, "Siparişler", OUTPUT_COLUMNS, frame_rows(result_df, OUTPUT_COLUMNS))
+    write_summary_sheets(
+        workbook, store_totals, product_count, product_totals, product_descriptions,
+        include_summary, include_product_sheet, summary
+    )
+    
+    output = BytesIO()
+    workbook.save(output)
+    return output.getvalue()
+
+def summary_tables(store_totals, product_count, product_totals, product_descriptions,
+                   include_summary=True, include_product_sheet=True, summary=None):
+    """Özet sayfalarını (başlık, sütunlar, satırlar) listesi olarak hazırla"""
+    summary = summary or build_summary(store_totals, product_totals, product_descriptions)
+    tables = []
+    if include_summary:
+        # Özet sayfası
+        tables.append(("Özet", ["Metrik", "Değer"], [
+            ("Toplam Mağaza", len(summary.stores)),
+            ("Toplam Ürün", product_count),
+            ("Toplam Miktar", summary.stores.total()),
+            ("İşlem Tarihi", datetime.now().strftime("%d.%m.%Y %H:%M")),
+        ]))
+        
+        # Mağaza toplamları sayfası
+        order = summary.stores.order()
+        tables.append(("Mağaza Toplamları", ['Mağaza Kodu', 'Toplam Miktar'], zip(
+            summary.stores.keys[order].tolist(), summary.stores.totals[order].tolist()
+        )))
+    
+    if include_product_sheet:
+        # Ürün toplamları sayfası
+        order = summary.products.order()
+        codes = summary.products.keys[order].tolist()
+        tables.append(("Ürün Toplamları", ["Ürün Kodu", "Ürün Açıklama", "Toplam Miktar"], zip(
+            codes, [summary.product_descriptions.get(kod, "") for kod in codes], summary.products.totals[order].tolist()
+        )))
+    return tables
+
+def write_summary_sheets(workbook, store_totals, product_count, product_totals, product_descriptions,
+                         include_summary=True, include_product_sheet=True, summary=None):
+    """Özet, mağaza ve ürün toplamı sayfalarını ekle"""
+    for title, columns, rows in summary_tables(
+        store_totals, product_count, product_totals, product_descriptions, include_summary, include_product_sheet, summary
+    ):
+        _write_sheet(workbook, title, columns, rows)
+
+def _chunks(df, prepare=None):
+    """DataFrame'i EXPORT_CHUNK_ROWS satırlık parçalara böl (boş tablo tek boş parça verir)"""
+    for start in range(0, max(len(df), 1), EXPORT_CHUNK_ROWS):
+        chunk = df.iloc[start:start + EXPORT_CHUNK_ROWS]
+        yield chunk if prepare is None else prepare(chunk)
+
+def _write_csv(stream, chunks, compress=False):
+    """Parçaları sırayla CSV olarak yaz (istenirse gzip ile sıkıştırarak); stream açık bırakılır"""
+    # mtime=0: aynı içerik her seferinde aynı baytları üretir
+    target = gzip.GzipFile(fileobj=stream, mode="wb", mtime=0) if compress else stream
+    # Windows'taki ERP içe aktarımları için CRLF satır sonu
+    text = io.TextIOWrapper(target, encoding=CSV_ENCODING, newline="")
+    for number, chunk in enumerate(chunks):
+        chunk.to_csv(text, sep=CSV_SEPARATOR, index=False, header=number == 0, lineterminator="\r\n")
+    text.detach()
+    if compress:
+        target.close()
+
+def _write_parquet(stream, chunks):
+    """Parçaları satır grupları halinde Parquet olarak yaz"""
+    writer = None
+    try:
+        for chunk in chunks:
+            # Özet sayfasındaki gibi sayı ve metin karışık sütunlar metne çevrilir
+            mixed = [name for name in chunk.columns if pd.api.types.infer_dtype(chunk[name], skipna=True).startswith("mixed")]
+            table = pa.Table.from_pandas(chunk.astype({name: str for name in mixed}), preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(stream, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+def build_archive_export(result, extension="csv", include_summary=True, include_product_sheet=True, summary=None):
+    """Her sayfayı ayrı bir CSV/CSV.gz/Parquet dosyası olarak tek bir zip içinde oluştur"""
+    result_df, store_totals, product_count, _, (product_totals, product_descriptions) = result
+    # Uzun tablonun boş sütunları parça parça, yazılırken eklenir
+    tables = [("Siparişler", _chunks(result_df, output_frame))] + [
+        (title, _chunks(pd.DataFrame(rows, columns=list(columns))))
+        for title, columns, rows in summary_tables(
+            store_totals, product_count, product_totals, product_descriptions,
+            include_summary, include_product_sheet, summary
+        )
+    ]
+    # Zaten sıkıştırılmış dosyalar zip içinde yeniden sıkıştırılmaz
+    compression = zipfile.ZIP_DEFLATED if extension == "csv" else zipfile.ZIP_STORED
+    
+    output = BytesIO()
+    with zipfile.ZipFile(output, "w", compression) as archive:
+        for title, chunks in tables:
+            with archive.open(f"{title}.{extension}", "w", force_zip64=True) as entry:
+                if extension == "parquet":
+                    _write_parquet(entry, chunks)
+                else:
+                    _write_csv(entry, chunks, compress=extension == "csv.gz")
+    return output.getvalue()
+
+def _split_file_name(store, extension):
+    """Mağaza kodunu zip içinde güvenle kullanılabilir dosya adına çevir"""
+    name = re.sub(r'[^\w.-]+', '_', str(store)).strip('._') or "magaza"
+    return f"{name}.{extension}"
+
+def _store_file(name, df, extension):
+    """Tek mağazanın siparişlerini seçilen formatta yaz; (ad, satır, baytlar, süre) döndür
+    
+    İşçide çalışır; ProcessPoolExecutor ile de kullanılabilmesi için modül düzeyindedir.
+    """
+    started = time.perf_counter()
+    output = BytesIO()
+    if extension == "xlsx":
+        workbook = Workbook(write_only=True)
+        _write_sheet(workbook, "Siparişler", OUTPUT_COLUMNS, frame_rows(df, OUTPUT_COLUMNS))
+        workbook.save(output)
+    elif extension == "parquet":
+        _write_parquet(output, _chunks(df, output_frame))
+    else:
+        _write_csv(output, _chunks(df, output_frame), compress=extension == "csv.gz")
+    return name, len(df), output.getvalue(), time.perf_counter() - started
+
+def _store_frames(result_df, extension):
+    """Satırları bir kez mağazaya göre grupla; (dosya adı, mağaza tablosu) çiftlerini ilk görülme sırasıyla üret"""
+    groups = result_df.groupby("Mağaza Kodu2", sort=False, observed=True).indices
+    for store, positions in groups.items():
+        df = result_df.take(positions)
+        # Kategorik sütunlar düz değerlere çevrilir; işçiye tüm sözlük gönderilmez
+        df = df.astype({name: object for name in df.columns if isinstance(df[name].dtype, pd.CategoricalDtype)})
+        yield _split_file_name(store, extension), df.reset_index(drop=True)
+
+def write_split_export(stream, result, extension="xlsx", max_workers=None, executor_class=ThreadPoolExecutor):
+    """Her mağazanın siparişlerini ayrı dosya olarak paralel yaz ve zip akışına ekle
+    
+    Dosyalar zip'e mağazaların ilk görülme sırasıyla eklenir. Komut satırında
+    executor_class olarak ProcessPoolExecutor verilebilir (openpyxl yazımı GIL'i
+    bırakmaz). Dosya başına SplitFile listesi döndürür.
+    """
+    result_df = result[0]
+    max_workers = max_workers or min(8, os.cpu_count() or 1)
+    # Zaten sıkıştırılmış dosyalar zip içinde yeniden sıkıştırılmaz
+    compression = zipfile.ZIP_DEFLATED if extension == "csv" else zipfile.ZIP_STORED
+    files = []
+    with zipfile.ZipFile(stream, "w", compression) as archive, executor_class(max_workers=max_workers) as executor:
+        pending = deque()
+        
+        def write_next():
+            name, rows, data, seconds = pending.popleft().result()
+            archive.writestr(name, data)
+            files.append(SplitFile(name, rows, len(data), seconds))
+        
+        for name, df in _store_frames(result_df, extension):
+            pending.append(executor.submit(_store_file, name, df, extension))
+            if len(pending) >= max_workers * SPLIT_PENDING_PER_WORKER:
+                write_next()
+        while pending:
+            write_next()
+    return files
+
+def spool_split_export(result, extension="xlsx", max_workers=None):
+    """Mağaza bazında bölünmüş zip'i geçici dosyaya yaz; (başa sarılmış dosya, dosya süreleri) döndür
+    
+    Geçici dosya kapatıldığında (ya da çöp toplandığında) silinir.
+    """
+    output = tempfile.TemporaryFile()
+    try:
+        files = write_split_export(output, result, extension, max_workers)
+    except BaseException:
+        output.close()
+        raise
+    output.seek(0)
+    return output, files
+
+def build_export(result, extension="xlsx", include_summary=True, include_product_sheet=True, summary=None):
+    """Seçilen formatta çıktı baytlarını oluştur (xlsx dışındakiler zip olarak)"""
+    if extension == "xlsx":
+        return build_excel_export(result, include_summary, include_product_sheet, summary)
+    return build_archive_export(result, extension, include_summary, include_product_sheet, summary)
+
+def export_mime(extension):
+    """İndirme butonu için MIME türü"""
+    if extension == "xlsx":
+        return "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    return "application/zip"
+
+def build_consolidated_export(consolidation, files_df, summary=None):
+    """Birleştirilmiş mağaza x ürün toplamları ve dosya özetleriyle çalışma kitabı oluştur"""
+    workbook = Workbook(write_only=True)
+    pair_totals = consolidation.pair_totals.rename(columns={
+        "Mağaza Kodu2": "Mağaza Kodu", "Kod": "Ürün Kodu", "MALZEME TANIMI": "Ürün Açıklama",
+        "Adet": "Toplam Miktar", "Dosya": "Dosya Sayısı",
+    })
+    _write_sheet(workbook, "Mağaza x Ürün", pair_totals.columns, frame_rows(pair_totals))
+    write_summary_sheets(
+        workbook, consolidation.store_totals, len(consolidation.product_totals),
+        consolidation.product_totals, consolidation.product_descriptions, summary=summary
+    )
+    _write_sheet(workbook, "Dosyalar", files_df.columns, frame_rows(files_df))
+    
+    output = BytesIO()
+    workbook.save(output)
+    return output.getvalue()
+
+def cached_export(cache, key, result, extension="xlsx", include_summary=True, include_product_sheet=True,
+                  profiler=NULL_PROFILER, summary=None):
+    """Çıktıyı yalnızca gerektiğinde oluştur, aynı sonuç, format ve seçenekler için yeniden kullan"""
+    export_key = (key, extension, include_summary, include_product_sheet)
+    data = cache.get(export_key)
+    if data is None:
+        with profiler.stage("export", rows_in=len(result[0])) as stage:
+            data = build_export(result, extension, include_summary, include_product_sheet, summary)
+            stage["output_bytes"] = len(data)
+        cache.put(export_key, data, len(data))
+    return data
+
+def prepare_split_export(cache, key, result, extension="xlsx", profiler=NULL_PROFILER):
+    """Mağaza bazında bölünmüş zip'i geçici dosyaya yazıp döndür (indirme anında çağrılır)
+    
+    Zip baytları önbelleğe alınmaz; her mağaza için bir dosya olduğundan çıktı
+    sonuç tablosu kadar büyüyebilir. Önbellekte yalnızca split_export_files'ın
+    gösterdiği dosya süreleri saklanır.
+    """
+    with profiler.stage("export", rows_in=len(result[0])) as stage:
+        output, files = spool_split_export(result, extension)
+        stage["output_bytes"] = sum(entry.nbytes for entry in files)
+        stage["files"] = len(files)
+    cache.put((key, extension, "split"), files, 100 * len(files))
+    return output
+
+def split_export_files(cache, key, extension="xlsx"):
+    """Daha önce oluşturulmuş bölünmüş çıktının dosya süreleri (oluşturulmadıysa None)"""
+    return cache.get((key, extension, "split"))
+
+def export_file_name(original_filename, date_format="%Y%m%d_%H%M", extension="xlsx"):
+    """Dönüştürülmüş dosya için indirme/kayıt adı
+    
+    Yalnızca son uzantı atılır; "ABC Ltd. Şti. hafta1.xlsx" gibi noktalı adlar korunur.
+    """
+    stem = os.path.splitext(os.path.basename(original_filename))[0]
+    return f"{stem}_donusturulmus_{datetime.now().strftime(date_format)}.{extension}"
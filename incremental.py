@@ -0,0 +1,240 @@
+"""Revize edilmiş sipariş dosyaları için artımlı yeniden dönüştürme
+
+Aynı müşteriden gelen yeni sürümlerde genellikle yalnızca birkaç satır değişir.
+Önceki dönüşümün satır parmak izleri saklanır; yeni dosyada yalnızca eklenen ve
+değişen ürün satırları temizlenip uzun formata açılır, değişmeyen satırların
+çıktısı önceki sonuçtan alınır. Sonuç, dosyanın baştan dönüştürülmesiyle aynıdır.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from converter import (
+    DEFAULT_THRESHOLD, STORE_PATTERN, aggregate_totals, clean_store_block, concat_outputs, constant_column,
+    melt_quantities, prepare_products, read_order_file, store_code_columns
+)
+from profiling import NULL_PROFILER
+
+# Önceki dönüşümden saklananlar: satır anahtarları (ürün kodu, kaçıncı tekrar),
+# satır parmak izleri, her satırın çıktıdaki başlangıç konumları ve çıktının kendisi
+RevisionSnapshot = namedtuple("RevisionSnapshot", ["source", "row_keys", "fingerprints", "offsets", "output_df"])
+
+# Önceki sürüme göre satır sayıları ve mağaza/ürün bazında miktar farkları
+RevisionDiff = namedtuple("RevisionDiff", ["source", "added", "removed", "changed", "unchanged", "changes"])
+
+# Sütun konumuna göre farklı ağırlık, aynı değerlerin yer değiştirmesini de yakalar
+_COLUMN_SEED = np.uint64(0x9E3779B97F4A7C15)
+
+# Mantıksal hücrelerin özetine karıştırılır; True ile 1 ayrı özetlenir
+_BOOL_SALT = np.uint64(0x85EBCA77C2B2AE63)
+
+def _typed_hashes(values, cell_type):
+    """Aynı türdeki hücrelerin özetleri (boş ve NaN hücreler 0)"""
+    if issubclass(cell_type, (bool, np.bool_)):
+        return pd.util.hash_array(values.astype(np.uint8)) ^ _BOOL_SALT
+    if issubclass(cell_type, (int, np.integer, float, np.floating)):
+        # Sayılar tek biçimde (float64) özetlenir: 75 ile 75.0 aynıdır, boş bir hücre
+        # yüzünden sütun int64'ten float64'e dönse de diğer satırların özeti değişmez
+        numbers = values.astype(np.float64) + 0.0
+        hashed = pd.util.hash_array(numbers)
+        hashed[np.isnan(numbers)] = 0
+        return hashed
+    if issubclass(cell_type, str):
+        return pd.util.hash_array(values.astype(object))
+    if cell_type is type(None):
+        return np.zeros(len(values), dtype=np.uint64)
+    # Tarih vb. diğer değerler türüyle birlikte metne çevrilir
+    return pd.util.hash_array(np.array([f"{cell_type.__name__}:{value!r}" for value in values], dtype=object))
+
+def _cell_hashes(values):
+    """Bir sütunun hücre özetleri; her hücre yalnızca kendi değeri ve türüyle özetlenir"""
+    if values.dtype.kind in "biuf":
+        return _typed_hashes(values, values.dtype.type)
+    hashed = np.zeros(len(values), dtype=np.uint64)
+    types = np.frompyfunc(type, 1, 1)(values)
+    for cell_type in pd.unique(types):
+        rows = np.flatnonzero(types == cell_type)
+        hashed[rows] = _typed_hashes(values[rows], cell_type)
+    return hashed
+
+def snapshot_key(store_cols, threshold=DEFAULT_THRESHOLD):
+    """Aynı kaynağın sürümlerini eşleştiren anahtar (mağaza başlık imzası ve eşik)"""
+    return (tuple(col.column for col in store_cols), threshold)
+
+def row_fingerprints(block, description_text):
+    """Ürün satırlarının ham hücre değerlerinden 64 bit parmak izi üret
+    
+    Hücreler sütun sütun ve birbirinden bağımsız özetlenir; bir satırın parmak
+    izi dosyanın diğer satırlarına ve satır sırasına bağlı değildir.
+    """
+    columns = [description_text.to_numpy()] + [block.iloc[:, position].to_numpy() for position in range(block.shape[1])]
+    fingerprints = np.zeros(len(block), dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for position, values in enumerate(columns, start=1):
+            weight = np.uint64(position) * _COLUMN_SEED | np.uint64(1)
+            fingerprints += _cell_hashes(values) * weight
+    return fingerprints
+
+def row_keys(kod_text):
+    """Satır anahtarları: ürün kodu ve kodun dosyadaki kaçıncı tekrarı olduğu"""
+    occurrence = kod_text.groupby(kod_text, sort=False).cumcount()
+    return list(zip(kod_text.tolist(), occurrence.tolist()))
+
+def _segment_positions(starts, counts):
+    """Her satırın [start, start + count) aralığını tek bir konum dizisine aç"""
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+    return np.arange(offsets[-1]) + np.repeat(starts - offsets[:-1], counts)
+
+def _quantity_changes(before, after):
+    """İki uzun tablo parçası arasındaki mağaza/ürün bazında miktar farkları"""
+    keys = ["Mağaza Kodu2", "Kod"]
+    old = before.groupby(keys, sort=False, observed=True)["Adet"].sum().astype(np.int64).rename("Önceki Adet")
+    new = after.groupby(keys, sort=False, observed=True)["Adet"].sum().astype(np.int64).rename("Yeni Adet")
+    changes = pd.concat([old, new], axis=1).fillna(0).astype(np.int64)
+    changes["Fark"] = changes["Yeni Adet"] - changes["Önceki Adet"]
+    return changes[changes["Fark"] != 0].reset_index()
+
+def _match_rows(previous, keys, fingerprints):
+    """Yeni satırları önceki sürümün satırlarıyla eşle; (eşleşen eski satır ya da -1, değişmedi mi) döndür"""
+    if previous is None:
+        return np.full(len(keys), -1, dtype=np.int64), np.zeros(len(keys), dtype=bool)
+    previous_rows = {key: row for row, key in enumerate(previous.row_keys)}
+    match = np.array([previous_rows.get(key, -1) for key in keys], dtype=np.int64)
+    reused = match >= 0
+    reused[reused] = previous.fingerprints[match[reused]] == fingerprints[reused]
+    return match, reused
+
+def revision_diff(previous, snapshot, match=None, reused=None):
+    """İki anlık görüntü arasındaki satır sayıları ve mağaza/ürün bazında miktar farkları
+    
+    Yalnızca iki görüntüye bağlıdır; dönüşümden ayrı, örneğin her oturumda
+    kendi önceki yüklemesine göre hesaplanabilir.
+    """
+    if match is None:
+        match, reused = _match_rows(previous, snapshot.row_keys, snapshot.fingerprints)
+    # Değişen ve silinen eski satırların çıktısı, yeni dönüştürülen satırların çıktısıyla karşılaştırılır
+    stale = np.ones(len(previous.row_keys), dtype=bool)
+    stale[match[reused]] = False
+    stale_rows = np.flatnonzero(stale)
+    stale_positions = _segment_positions(previous.offsets[stale_rows], np.diff(previous.offsets)[stale_rows])
+    converted = np.flatnonzero(~reused)
+    converted_positions = _segment_positions(snapshot.offsets[converted], np.diff(snapshot.offsets)[converted])
+    matched = np.zeros(len(previous.row_keys), dtype=bool)
+    matched[match[match >= 0]] = True
+    return RevisionDiff(
+        source=previous.source,
+        added=int((match < 0).sum()),
+        removed=int((~matched).sum()),
+        changed=int(((match >= 0) & ~reused).sum()),
+        unchanged=int(reused.sum()),
+        changes=_quantity_changes(previous.output_df.take(stale_positions), snapshot.output_df.take(converted_positions)),
+    )
+
+def convert_revision(df, store_cols, magaza_kodu, threshold=DEFAULT_THRESHOLD, previous=None,
+                     source=None, profiler=NULL_PROFILER):
+    """Geniş tabloyu dönüştür; önceki sürümün değişmeyen satırlarını yeniden kullan
+    
+    convert_frame ile aynı sonucu, yeni anlık görüntüyü ve (previous verilmişse)
+    önceki sürüme göre farkları döndürür.
+    """
+    with profiler.stage("clean", rows_in=len(df)) as stage:
+        code_cols, store_codes = store_code_columns(store_cols)
+        product_mask, kod_text, description_text, product_descriptions = prepare_products(df)
+        block = df.loc[product_mask, code_cols]
+        fingerprints = row_fingerprints(block, description_text)
+        keys = row_keys(kod_text)
+        
+        match, reused = _match_rows(previous, keys, fingerprints)
+        
+        # Yalnızca eklenen ve değişen satırlar temizlenir
+        converted = np.flatnonzero(~reused)
+        quantities = clean_store_block(block.iloc[converted], threshold)
+        stage["rows_out"] = len(converted)
+    
+    with profiler.stage("reshape", rows_in=len(converted)) as stage:
+        partial_df = melt_quantities(
+            quantities, kod_text.iloc[converted], description_text.iloc[converted], store_codes, magaza_kodu
+        )
+        partial_counts = (quantities > 0).sum(axis=1)
+        partial_offsets = np.concatenate(([0], np.cumsum(partial_counts)))
+        
+        if previous is None:
+            output_df = partial_df
+            counts = partial_counts
+        else:
+            # Her satırın çıktısı ya önceki sonuçtan ya da yeni dönüştürülen parçadan alınır
+            previous_counts = np.diff(previous.offsets)
+            counts = np.zeros(len(keys), dtype=np.int64)
+            starts = np.zeros(len(keys), dtype=np.int64)
+            counts[reused] = previous_counts[match[reused]]
+            starts[reused] = previous.offsets[match[reused]]
+            counts[converted] = partial_counts
+            starts[converted] = len(previous.output_df) + partial_offsets[:-1]
+            positions = _segment_positions(starts, counts)
+            combined = concat_outputs([previous.output_df, partial_df])
+            output_df = combined.take(positions).reset_index(drop=True)
+            # Dosya adı değişmiş olabilir; Mağaza Kodu sütunu yeni adla yazılır
+            output_df["Mağaza Kodu"] = constant_column(magaza_kodu, len(output_df))
+        stage["rows_out"] = len(output_df)
+    
+    with profiler.stage("aggregate", rows_in=len(output_df)) as stage:
+        store_totals, product_totals = aggregate_totals(output_df)
+        stage["rows_out"] = len(store_totals) + len(product_totals)
+    
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+    snapshot = RevisionSnapshot(source, keys, fingerprints, offsets, output_df)
+    
+    diff = revision_diff(previous, snapshot, match, reused) if previous is not None else None
+    
+    result = (output_df, store_totals, int(product_mask.sum()), product_totals, product_descriptions)
+    return result, snapshot, diff
+
+def snapshot_nbytes(snapshot):
+    """Önbellek sınırı için anlık görüntünün yaklaşık bellek boyutu"""
+    # Anahtar listesi için kaba bir kayıt başı ek yük
+    return (int(snapshot.output_df.memory_usage(deep=True).sum()) + snapshot.fingerprints.nbytes
+            + snapshot.offsets.nbytes + 150 * len(snapshot.row_keys))
+
+class SourceSnapshots:
+    """Anlık görüntüleri dosya içeriği anahtarıyla paylaşılan önbellekte tutan görünüm
+    
+    Aynı dosya her oturumda aynı görüntüyü üretir; görüntüler bu yüzden
+    dönüşüm anahtarıyla (key) paylaşılabilir. Hangi dosyanın önceki sürüm
+    sayılacağı ise yalnızca latest sözlüğünde (başlık anahtarı -> dönüşüm
+    anahtarı) tutulur; her kaynak (örn. oturum) kendi sözlüğünü verir.
+    """
+    
+    def __init__(self, shared, latest, key):
+        self.shared = shared
+        self.latest = latest
+        self.key = key
+    
+    def get(self, header_key):
+        previous_key = self.latest.get(header_key)
+        return None if previous_key is None else self.shared.get(previous_key)
+    
+    def put(self, header_key, snapshot, nbytes):
+        self.shared.put(self.key, snapshot, nbytes)
+
+def revise_order(df, store_cols, original_filename, snapshots, threshold=DEFAULT_THRESHOLD, profiler=NULL_PROFILER):
+    """Okunmuş tabloyu artımlı dönüştür; (convert_file sonuç biçimi, farklar) döndür"""
+    key = snapshot_key(store_cols, threshold)
+    (output_df, store_totals, product_count, product_totals, product_descriptions), snapshot, diff = convert_revision(
+        df, store_cols, original_filename.rsplit('.', 1)[0], threshold, snapshots.get(key), original_filename, profiler
+    )
+    snapshots.put(key, snapshot, snapshot_nbytes(snapshot))
+    return (output_df, store_totals, product_count, len(store_cols), (product_totals, product_descriptions)), diff
+
+def convert_file_revision(file_buffer, original_filename, snapshots, threshold=DEFAULT_THRESHOLD,
+                          store_pattern=STORE_PATTERN, profiler=NULL_PROFILER):
+    """convert_file gibi çalışır; aynı başlıklı önceki dönüşüm varsa yalnızca farkları işler
+    
+    snapshots, get/put arayüzlü bir önbellektir (örn. ResultCache). Dönüş değeri
+    convert_file sonucuna ek olarak önceki sürüme göre farkları (yoksa None) içerir.
+    """
+    df, store_cols = read_order_file(file_buffer, store_pattern, profiler=profiler)
+    if not store_cols:
+        return store_cols, list(df.columns[:20]), None, None
+    result, diff = revise_order(df, store_cols, original_filename, snapshots, threshold, profiler)
+    return store_cols, list(df.columns[:20]), result, diff
@@ -0,0 +1,158 @@
+"""Dönüşümleri Streamlit betiğini bloklamadan arka planda çalıştırma
+
+Uzun dönüşümler süreç genelinde paylaşılan bir işçi havuzuna gönderilir; betik
+iş tutamacını oturumda saklar ve her çalıştırmada yalnızca durumunu okur. İşçi
+ilerlemeyi yalnızca tutamaçtaki alanlara yazar, arayüz bunları sabit aralıklarla
+okur; böylece satır ya da aşama sayısından bağımsız olarak saniyede birkaç
+güncelleme gönderilir. İptal, dönüştürme aşamalarının başında denetlenir.
+
+Aynı anahtarla gönderilen işler birleştirilir: aynı dosyayı yükleyen oturumlar
+tek bir dönüşümü bekler; iş, onu bekleyen son oturum da vazgeçince iptal edilir.
+"""
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from contextlib import contextmanager
+
+# Aynı anda çalışan dönüşüm sayısı; fazlası sırada bekler
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+
+# Aşama başladığında gösterilen ilerleme oranı ve açıklama
+STAGE_PROGRESS = {
+    "read": (0.05, "Dosya okunuyor"),
+    # Motora göre okumadan önce (openpyxl) veya sonra (calamine) çalışır
+    "detect": (0.05, "Mağaza sütunları belirleniyor"),
+    "clean": (0.5, "Miktarlar temizleniyor"),
+    "reshape": (0.7, "Uzun formata açılıyor"),
+    "aggregate": (0.85, "Toplamlar hesaplanıyor"),
+    "export": (0.9, "Çıktı yazılıyor"),
+}
+
+class JobCancelled(Exception):
+    """Kullanıcı işi iptal ettiğinde işçi içinde yükseltilir"""
+
+class Job:
+    """Arka plandaki bir işin tutamacı: ilerleme, iptal ve sonuç"""
+    
+    def __init__(self, name):
+        self.name = name
+        self.fraction = 0.0
+        self.message = "Sırada bekliyor"
+        self.started = time.monotonic()
+        self.future = None
+        self._cancel = threading.Event()
+        self._holders = 1
+        self._lock = threading.Lock()
+    
+    def attach(self):
+        """İşi bekleyen bir oturum daha ekle"""
+        with self._lock:
+            self._holders += 1
+    
+    def report(self, fraction, message):
+        """İlerlemeyi güncelle ve iptal istenmişse işi durdur"""
+        self.check_cancelled()
+        self.fraction = min(max(fraction, self.fraction), 1.0)
+        self.message = message
+    
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled(self.name)
+    
+    def cancel(self):
+        """Bu bekleyen için işi bırak; bekleyen kalmadıysa iptal et
+        
+        İptal edilen iş sıradaysa hiç başlamaz, çalışıyorsa sonraki aşamada durur.
+        """
+        with self._lock:
+            self._holders -= 1
+            if self._holders > 0:
+                return
+        self._cancel.set()
+        if self.future is not None:
+            self.future.cancel()
+    
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+    
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+    
+    def done(self):
+        return self.future is not None and self.future.done()
+    
+    def result(self):
+        """İşin sonucunu döndür (bitmemişse bekler); iptal edildiyse JobCancelled yükseltir"""
+        try:
+            return self.future.result()
+        except CancelledError:
+            raise JobCancelled(self.name) from None
+
+class ProgressProfiler:
+    """Aşama başlarında işin ilerlemesini güncelleyen ve iptali denetleyen profiler sarmalayıcısı"""
+    
+    def __init__(self, job, profiler):
+        self.job = job
+        self.profiler = profiler
+        self._counts = {}
+    
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        fraction, message = STAGE_PROGRESS.get(name, (self.job.fraction, name))
+        # Akış modunda okuma ve yazma aşamaları parça başına tekrarlanır
+        count = self._counts[name] = self._counts.get(name, 0) + 1
+        if count > 1:
+            message = f"{message} ({count}. parça)"
+        self.job.report(fraction, message)
+        with self.profiler.stage(name, rows_in) as record:
+            yield record
+
+class JobPool:
+    """Oturumlar arasında paylaşılan iş parçacığı havuzu
+    
+    İş parçacığı kullanılır: sonuç tabloları ve oturumdaki önbellekler süreçler
+    arasında kopyalanmadan paylaşılır. Bu paralel okuma sağlamaz; openpyxl saf
+    Python olduğundan okuma boyunca GIL'i tutar ve GIL'i yalnızca numpy/pandas
+    işlemlerinin bir kısmı bırakır. İşçiler betiği bloklamaz, ama süren büyük
+    bir okuma aynı süreçteki diğer oturumların betiklerini yavaşlatabilir.
+    """
+    
+    def __init__(self, max_workers=DEFAULT_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="conversion")
+        self._running = {}
+        self._lock = threading.Lock()
+    
+    def submit(self, name, fn, *args, **kwargs):
+        """fn(job, *args, **kwargs) çağrısını havuza gönder ve iş tutamacını döndür"""
+        job = Job(name)
+        job.future = self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+    
+    def submit_shared(self, key, name, fn, *args, **kwargs):
+        """Aynı anahtarlı iş sürüyorsa ona katıl, yoksa yeni iş başlat"""
+        with self._lock:
+            job = self._running.get(key)
+            if job is not None and not job.done() and not job.cancelled:
+                job.attach()
+                return job
+            job = self._running[key] = self.submit(name, fn, *args, **kwargs)
+        job.future.add_done_callback(lambda _: self._forget(key, job))
+        return job
+    
+    def _forget(self, key, job):
+        with self._lock:
+            if self._running.get(key) is job:
+                del self._running[key]
+    
+    @staticmethod
+    def _run(job, fn, args, kwargs):
+        job.report(0.0, "Başladı")
+        result = fn(job, *args, **kwargs)
+        job.fraction, job.message = 1.0, "Tamamlandı"
+        return result
+    
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
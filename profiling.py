@@ -0,0 +1,74 @@
+"""Dönüştürme aşamaları için süre, CPU, satır ve bellek ölçümü"""
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+class StageProfiler:
+    """Aşama bazında duvar/CPU süresi, satır sayıları ve bellek tepesi toplayıcı
+    
+    Biten her aşama records listesine, varsa sink'e (örn. oturumdaki deque) ve
+    log_path verilmişse JSON satırları dosyasına eklenir. trace_memory açıksa
+    aşama süresince tracemalloc çalıştırılır; bu ölçümü belirgin şekilde yavaşlatır.
+    """
+    
+    def __init__(self, run, trace_memory=False, sink=None, log_path=None):
+        self.run = run
+        self.trace_memory = trace_memory
+        self.sink = sink
+        self.log_path = log_path
+        self.records = []
+    
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """Bir aşamayı ölç; çağıran taraf dönen kayda rows_out gibi alanlar ekleyebilir"""
+        record = {"run": self.run, "stage": name, "rows_in": rows_in, "rows_out": None}
+        started_tracing = False
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+            memory_before = tracemalloc.get_traced_memory()[0]
+        wall_started = time.perf_counter()
+        cpu_started = time.thread_time()
+        try:
+            yield record
+        finally:
+            record["wall_s"] = time.perf_counter() - wall_started
+            record["cpu_s"] = time.thread_time() - cpu_started
+            record["peak_mb"] = None
+            if self.trace_memory:
+                record["peak_mb"] = (tracemalloc.get_traced_memory()[1] - memory_before) / 1024**2
+                if started_tracing:
+                    tracemalloc.stop()
+            record["timestamp"] = datetime.now().isoformat(timespec="seconds")
+            self._finish(record)
+    
+    def _finish(self, record):
+        self.records.append(record)
+        if self.sink is not None:
+            self.sink.append(record)
+        if self.log_path:
+            with open(self.log_path, "a", encoding="utf-8") as handle:
+                handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+    
+    def totals(self):
+        """Aynı adlı aşamaları (örn. akış modundaki parçalar) topla"""
+        totals = {}
+        for record in self.records:
+            total = totals.setdefault(record["stage"], {"wall_s": 0.0, "cpu_s": 0.0, "peak_mb": None})
+            total["wall_s"] += record["wall_s"]
+            total["cpu_s"] += record["cpu_s"]
+            if record["peak_mb"] is not None:
+                total["peak_mb"] = max(total["peak_mb"] or 0.0, record["peak_mb"])
+        return totals
+
+class _NullProfiler:
+    """Ölçüm istenmediğinde kullanılan, hiçbir şey kaydetmeyen profiler"""
+    
+    def stage(self, name, rows_in=None):
+        return nullcontext({})
+
+NULL_PROFILER = _NullProfiler()
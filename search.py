@@ -0,0 +1,100 @@
+"""Ürün arama kutusu için önceden hazırlanmış arama indeksi"""
+from bisect import bisect_left
+
+import numpy as np
+
+# Aranan metin bu uzunluktaki parçalara bölünerek indekslenir
+NGRAM = 3
+
+def turkish_fold(text):
+    """Türkçe kurallarıyla küçük harfe çevir (İ -> i, I -> ı)"""
+    return str(text).replace("İ", "i").replace("I", "ı").lower()
+
+def search_fold(text):
+    """Arama anahtarı: Türkçe küçük harf, noktalı ve noktasız i ayrımı olmadan
+    
+    Türkçe klavyesiz yazılan "SILIKON" ile "silikon" ve "SİLİKON" aynı ürünü
+    bulur; i, ı, I ve İ birbirinin yerine geçer.
+    """
+    return turkish_fold(text).replace("ı", "i")
+
+def _ngrams(text, n=NGRAM):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+class ProductSearchIndex:
+    """Ürün kodu ve açıklamasında alt metin araması için n-gram indeksi
+    
+    Ürünler toplam miktara göre sıralanır ve bu sıra numarasıyla indekslenir;
+    böylece eşleşmeler ek sıralama gerekmeden en çok sipariş edilenden başlayarak
+    döner. Kısa sorgular (NGRAM'dan kısa) önceden katlanmış metinlerde taranır.
+    Kod önekleri ("30.77") ayrıca sıralı kod listesinde ikili aramayla bulunur.
+    """
+    
+    def __init__(self, product_descriptions, product_totals):
+        codes = [kod for kod in product_descriptions if kod in product_totals]
+        codes.sort(key=lambda kod: product_totals[kod], reverse=True)
+        self.codes = codes
+        # Kod ile açıklama arasındaki satır sonu, iki alanı aşan eşleşmeleri engeller
+        folded_codes = [search_fold(kod) for kod in codes]
+        self._keys = [f"{folded}\n{search_fold(product_descriptions[kod])}" for folded, kod in zip(folded_codes, codes)]
+        # Önek araması: katlanmış kodlar alfabetik sırada, yanlarında sıra numaraları
+        order = sorted(range(len(codes)), key=folded_codes.__getitem__)
+        self._sorted_codes = [folded_codes[rank] for rank in order]
+        self._sorted_ranks = np.array(order, dtype=np.int32)
+        
+        postings = {}
+        for rank, key in enumerate(self._keys):
+            for gram in _ngrams(key):
+                postings.setdefault(gram, []).append(rank)
+        self._postings = {gram: np.array(ranks, dtype=np.int32) for gram, ranks in postings.items()}
+    
+    def _prefix_ranks(self, term):
+        """Kodu term ile başlayan ürünlerin sıra numaraları (artan sırada)"""
+        start = bisect_left(self._sorted_codes, term)
+        # Önekle başlayan kodlar sıralı listede ardışıktır; önekin ardılından önce biter
+        end = bisect_left(self._sorted_codes, term[:-1] + chr(ord(term[-1]) + 1), lo=start)
+        return np.sort(self._sorted_ranks[start:end])
+    
+    def prefix(self, query):
+        """Kodu sorguyla başlayan ürün kodlarını toplam miktara göre azalan sırada döndür"""
+        term = search_fold(query.strip())
+        if not term or "\n" in term:
+            return []
+        return [self.codes[rank] for rank in self._prefix_ranks(term)]
+    
+    def search(self, query):
+        """Sorguyu içeren ürün kodlarını döndür
+        
+        Kodu sorguyla başlayanlar önce, koddaki veya açıklamadaki diğer eşleşmeler
+        sonra gelir; her grup kendi içinde toplam miktara göre azalan sıradadır.
+        """
+        term = search_fold(query.strip())
+        if not term or "\n" in term:
+            return []
+        prefix_ranks = self._prefix_ranks(term)
+        if len(term) < NGRAM:
+            candidates = [rank for rank, key in enumerate(self._keys) if term in key]
+        else:
+            candidates = self._substring_ranks(term)
+        others = np.setdiff1d(candidates, prefix_ranks, assume_unique=True)
+        return [self.codes[rank] for rank in prefix_ranks] + [self.codes[rank] for rank in others]
+    
+    def _substring_ranks(self, term):
+        postings = [self._postings.get(gram) for gram in _ngrams(term)]
+        if any(ranks is None for ranks in postings):
+            return []
+        # En seçici parçadan başlayarak kesiştir, sonra gerçek alt metin eşleşmesini doğrula
+        postings.sort(key=len)
+        candidates = postings[0]
+        for ranks in postings[1:]:
+            candidates = np.intersect1d(candidates, ranks, assume_unique=True)
+            if len(candidates) == 0:
+                return []
+        return [rank for rank in candidates if term in self._keys[rank]]
+    
+    @property
+    def nbytes(self):
+        # Sözlük ve metin kayıtları için kaba bir kayıt başı ek yük
+        postings_bytes = sum(ranks.nbytes + 100 for ranks in self._postings.values())
+        sorted_bytes = self._sorted_ranks.nbytes + sum(len(kod) + 60 for kod in self._sorted_codes)
+        return postings_bytes + sorted_bytes + sum(2 * len(key) + 150 for key in self._keys)
@@ -0,0 +1,107 @@
+"""Oturumlar arasında paylaşılan sonuç önbelleği ve isteğe bağlı disk önbelleği
+
+Aynı dosyayı yükleyen kullanıcılar aynı içerik özetine ulaşır; dönüşüm süreç
+genelinde bir kez yapılır ve bellek sınırı tüm oturumlar için birlikte uygulanır.
+Disk önbelleği verilirse dönüşümler uygulama yeniden başlatıldıktan sonra da
+yeniden kullanılır.
+"""
+import hashlib
+import os
+import pickle
+import threading
+
+from converter import ResultCache
+
+# Kayıt biçimi değiştiğinde artırılır; eski disk kayıtları kendiliğinden geçersiz olur
+DISK_CACHE_VERSION = 5
+
+class DiskCache:
+    """Sonuçları yerel bir dizinde pickle dosyaları olarak saklayan boyut sınırlı önbellek
+    
+    Dosyaların değiştirilme zamanı son kullanım zamanı olarak tutulur; sınır
+    aşılınca en uzun süredir kullanılmayanlar silinir. Dizin yalnızca bu uygulama
+    tarafından yazılmalıdır (pickle güvenilmeyen dosyalar için güvenli değildir).
+    """
+    
+    def __init__(self, directory, max_bytes=2 * 1024**3):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+    
+    def _path(self, key):
+        digest = hashlib.sha256(repr((DISK_CACHE_VERSION, key)).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.pkl")
+    
+    def get(self, key):
+        """(değer, bayt) çiftini döndür; kayıt yoksa veya okunamıyorsa None"""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as handle:
+                stored_key, value, nbytes = pickle.load(handle)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError, AttributeError, ImportError):
+            # Yarım kalmış veya eski sürümden kalan kayıt
+            return None
+        if stored_key != key:
+            return None
+        return value, nbytes
+    
+    def put(self, key, value, nbytes):
+        path = self._path(key)
+        # Aynı anda okuyanlar yarım dosya görmesin diye önce geçici dosyaya yazılır
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temporary, "wb") as handle:
+                pickle.dump((key, value, nbytes), handle, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, path)
+        except OSError:
+            # Disk önbelleği yalnızca hızlandırır; yazılamazsa sonuç bellekte kalır
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            return
+        self._evict()
+    
+    def _evict(self):
+        with self._lock:
+            entries = []
+            with os.scandir(self.directory) as scan:
+                for entry in scan:
+                    if entry.name.endswith(".pkl"):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+
+class SharedCache(ResultCache):
+    """Süreç genelinde paylaşılan LRU önbellek; disk verilirse bellekte olmayan kayıtlar oradan yüklenir"""
+    
+    def __init__(self, max_entries=64, max_bytes=1024**3, disk=None):
+        super().__init__(max_entries, max_bytes)
+        self.disk = disk
+    
+    def get(self, key):
+        value = super().get(key)
+        if value is None and self.disk is not None:
+            stored = self.disk.get(key)
+            if stored is not None:
+                value, nbytes = stored
+                super().put(key, value, nbytes)
+        return value
+    
+    def put(self, key, value, nbytes):
+        # Aynı işi bekleyen oturumlar aynı sonucu yeniden yazar; diske bir kez yazılır
+        if super().get(key) is value:
+            return
+        super().put(key, value, nbytes)
+        if self.disk is not None:
+            self.disk.put(key, value, nbytes)
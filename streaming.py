@@ -0,0 +1,134 @@
+"""Büyük dosyalar için parça parça (sınırlı bellekli) dönüştürme"""
+from itertools import islice
+from operator import itemgetter
+
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+
+from converter import (
+    DEFAULT_THRESHOLD, OUTPUT_COLUMNS, PRODUCT_CODE_COLUMN, PRODUCT_DESCRIPTION_COLUMN,
+    STORE_PATTERN, convert_frame, find_store_columns, needed_positions
+)
+from enrichment import NO_REFERENCE, enrich_output
+from exporter import frame_rows, start_sheet, write_summary_sheets
+from profiling import NULL_PROFILER
+
+# Bir seferde belleğe alınan girdi satırı sayısı
+CHUNK_ROWS = 500
+
+def _cell_value(value):
+    """pandas okuyucusu gibi tam sayı değerli float'ları int'e çevir"""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def iter_order_chunks(source, store_pattern=STORE_PATTERN, chunk_rows=CHUNK_ROWS):
+    """Mağaza sütunlarını ve ürün/mağaza sütunlarından oluşan satır parçalarını üret
+    
+    İlk değer (store_cols, column_preview) çiftidir; ardından her biri en fazla
+    chunk_rows satırlık DataFrame'ler gelir. Çalışma sayfası openpyxl read-only
+    modunda akış halinde okunur, dosyanın tamamı hiçbir zaman belleğe alınmaz.
+    """
+    # Sütun adları pandas ile aynı olsun diye başlık pandas ile okunur
+    header = pd.read_excel(source, nrows=0, engine="openpyxl")
+    store_cols, _, _ = find_store_columns(header, store_pattern)
+    yield store_cols, list(header.columns[:20])
+    if not store_cols:
+        return
+    
+    positions = needed_positions(header.columns, store_cols)
+    labels = [header.columns[pos] for pos in positions]
+    text_positions = [i for i, label in enumerate(labels) if label in (PRODUCT_CODE_COLUMN, PRODUCT_DESCRIPTION_COLUMN)]
+    pick = itemgetter(*positions)
+    width = positions[-1] + 1
+    
+    if hasattr(source, "seek"):
+        source.seek(0)
+    workbook = load_workbook(source, read_only=True, data_only=True, keep_links=False)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        # pandas gibi baştaki boş satırları atla; ilk dolu satır başlıktır
+        for row in rows:
+            if any(value is not None for value in row):
+                break
+        
+        while True:
+            chunk = []
+            for row in islice(rows, chunk_rows):
+                if len(row) < width:
+                    row = tuple(row) + (None,) * (width - len(row))
+                values = pick(row)
+                if len(positions) == 1:
+                    values = (values,)
+                chunk.append(values)
+            if not chunk:
+                break
+            
+            # Tür çıkarımı parçaya göre değişmesin diye object olarak tutulur
+            chunk_df = pd.DataFrame(chunk, columns=labels, dtype=object)
+            for i in text_positions:
+                # map sonucu yeniden çıkarsanırsa boş hücreli parçada int'ler float64'e döner
+                chunk_df.isetitem(i, pd.Series(
+                    [_cell_value(value) for value in chunk_df.iloc[:, i].tolist()], index=chunk_df.index, dtype=object
+                ))
+            yield chunk_df
+    finally:
+        workbook.close()
+
+def stream_convert_file(source, output, original_filename, threshold=DEFAULT_THRESHOLD,
+                        store_pattern=STORE_PATTERN, chunk_rows=CHUNK_ROWS,
+                        include_summary=True, include_product_sheet=True, profiler=NULL_PROFILER,
+                        reference=NO_REFERENCE):
+    """Dosyayı parça parça dönüştür ve "Siparişler" sayfasına doğrudan yaz
+    
+    Bellekte yalnızca o anki parça ile mağaza/ürün toplamları tutulur.
+    convert_file ile aynı biçimde (store_cols, column_preview, summary) döner;
+    summary'nin ilk elemanı DataFrame yerine yazılan satır sayısıdır. reference
+    verilirse her parça yazılmadan önce mağaza adı ve fiyatlarla zenginleştirilir;
+    TOPLAM mutabakatı bu modda yapılmaz.
+    """
+    chunks = iter_order_chunks(source, store_pattern, chunk_rows)
+    with profiler.stage("read"):
+        store_cols, column_preview = next(chunks)
+    if not store_cols:
+        return store_cols, column_preview, None
+    
+    magaza_kodu = original_filename.rsplit('.', 1)[0]
+    store_totals = {}
+    product_totals = {}
+    product_descriptions = {}
+    product_count = 0
+    row_count = 0
+    
+    workbook = Workbook(write_only=True)
+    sheet = start_sheet(workbook, "Siparişler", OUTPUT_COLUMNS)
+    while True:
+        with profiler.stage("read") as stage:
+            chunk_df = next(chunks, None)
+            stage["rows_out"] = 0 if chunk_df is None else len(chunk_df)
+        if chunk_df is None:
+            break
+        
+        output_df, chunk_stores, chunk_products, chunk_product_totals, chunk_descriptions = convert_frame(
+            chunk_df, store_cols, magaza_kodu, threshold, profiler
+        )
+        with profiler.stage("export", rows_in=len(output_df)):
+            for row in frame_rows(enrich_output(output_df, reference), OUTPUT_COLUMNS):
+                sheet.append(row)
+        
+        # Parçalar sırayla işlendiği için ilk görülme sırası korunur
+        for code, amount in chunk_stores.items():
+            store_totals[code] = store_totals.get(code, 0) + amount
+        for kod, amount in chunk_product_totals.items():
+            product_totals[kod] = product_totals.get(kod, 0) + amount
+        product_descriptions.update(chunk_descriptions)
+        product_count += chunk_products
+        row_count += len(output_df)
+    
+    with profiler.stage("export", rows_in=row_count):
+        write_summary_sheets(
+            workbook, store_totals, product_count, product_totals, product_descriptions,
+            include_summary, include_product_sheet
+        )
+        workbook.save(output)
+    return store_cols, column_preview, (row_count, store_totals, product_count, len(store_cols), (product_totals, product_descriptions))
@@ -0,0 +1,73 @@
+"""Mağaza ve ürün toplamlarının sıralı özetleri
+
+Toplam sözlükleri dönüşüm başına bir kez diziye çevrilir. Paneller için ilk N
+kayıt argpartition ile kısmi seçimle, dışa aktarma sayfaları için tam sıralama
+tek bir kararlı argsort ile bulunur; iki yol da aynı sırayı verir (azalan
+toplam, eşitlerde sözlükteki sıra).
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+class RankedTotals:
+    """Anahtar -> toplam sözlüğünün dizi tabanlı, sıralanabilir hali"""
+    
+    def __init__(self, totals):
+        self.keys = np.array(list(totals), dtype=object)
+        self.totals = np.fromiter(totals.values(), dtype=np.int64, count=len(totals))
+        self._order = None
+    
+    def __len__(self):
+        return len(self.totals)
+    
+    def order(self):
+        """Tüm kayıtların azalan toplam sırasındaki konumları (bir kez hesaplanır)"""
+        if self._order is None:
+            self._order = np.argsort(-self.totals, kind="stable")
+        return self._order
+    
+    def top(self, n):
+        """En büyük n kaydın konumları; tam sıralama yapmadan kısmi seçimle"""
+        count = len(self.totals)
+        if self._order is not None or n >= count:
+            return self.order()[:n]
+        if n <= 0:
+            return np.empty(0, dtype=np.intp)
+        # n. en büyük değerin üstündekiler ve bu değere eşit olanların ilkleri seçilir
+        kth = np.partition(self.totals, count - n)[count - n]
+        above = np.flatnonzero(self.totals > kth)
+        ties = np.flatnonzero(self.totals == kth)[:n - len(above)]
+        positions = np.concatenate([above, ties])
+        return positions[np.lexsort((positions, -self.totals[positions]))]
+    
+    def total(self):
+        return int(self.totals.sum())
+
+# Bir dönüşümün sıralı mağaza/ürün toplamları ve ürün açıklamaları
+ConversionSummary = namedtuple("ConversionSummary", ["stores", "products", "product_descriptions"])
+
+def build_summary(store_totals, product_totals, product_descriptions):
+    """Toplam sözlüklerinden panel ve dışa aktarmaların paylaştığı özeti kur"""
+    return ConversionSummary(RankedTotals(store_totals), RankedTotals(product_totals), product_descriptions)
+
+def store_table(summary, positions):
+    """Verilen konumlardaki mağazalar (sırası korunur)"""
+    return pd.DataFrame({
+        "Mağaza Kodu": summary.stores.keys[positions],
+        "Toplam Miktar": summary.stores.totals[positions],
+    })
+
+def product_table(summary, positions, missing=""):
+    """Verilen konumlardaki ürünler ve açıklamaları (sırası korunur)"""
+    codes = summary.products.keys[positions]
+    return pd.DataFrame({
+        "Ürün Kodu": codes,
+        "Ürün Açıklama": [summary.product_descriptions.get(kod, missing) for kod in codes],
+        "Toplam Miktar": summary.products.totals[positions],
+    })
+
+def summary_nbytes(summary):
+    """Önbellek sınırı için özetin yaklaşık bellek boyutu"""
+    # Anahtar nesneleri için kaba bir kayıt başı ek yük
+    return sum(ranked.totals.nbytes * 3 + 100 * len(ranked) for ranked in (summary.stores, summary.products))
@@ -0,0 +1,37 @@
+"""Dönüşüm arşivinin saklama sınırı testleri
+    
+    python -m pytest -q test_archive.py
+"""
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from archive import list_conversions, save_conversion
+from converter import convert_file
+from test_conversion import EDGE_ROWS, write_order_sheet
+
+@pytest.fixture
+def result(tmp_path):
+    path = write_order_sheet(tmp_path / "siparis.xlsx", EDGE_ROWS)
+    return convert_file(str(path), path.name)[2]
+
+def test_oldest_conversions_are_pruned(tmp_path, result):
+    root = tmp_path / "conversions"
+    started = datetime(2026, 1, 1, 9)
+    for day in range(5):
+        save_conversion(result, f"siparis{day}.xlsx", f"{day:08d}", 10, str(root), started + timedelta(days=day), max_entries=3)
+    
+    assert [entry.source for entry in list_conversions(str(root))] == ["siparis4", "siparis3", "siparis2"]
+    # Boşalan tarih dizinleri de silinir
+    assert sorted(os.listdir(root)) == ["date=2026-01-03", "date=2026-01-04", "date=2026-01-05"]
+
+def test_byte_limit_keeps_newest(tmp_path, result):
+    root = str(tmp_path / "conversions")
+    started = datetime(2026, 1, 1, 9)
+    save_conversion(result, "eski.xlsx", "0" * 8, 10, root, started)
+    save_conversion(result, "yeni.xlsx", "1" * 8, 10, root, started + timedelta(hours=1), max_bytes=1)
+    
+    assert [entry.source for entry in list_conversions(root)] == ["yeni"]
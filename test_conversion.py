@@ -0,0 +1,242 @@
+"""Dönüştürme hattının referans davranışla eşitlik testleri
+    
+    python -m pytest -q test_conversion.py
+
+Sütunsal dönüştürücü, ilk sürümdeki satır satır (iterrows) döngünün
+çıktısıyla; akış modu ve artımlı dönüşüm de bellekte yapılan tam dönüşümle
+karşılaştırılır.
+"""
+import re
+from io import BytesIO
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook, load_workbook
+
+import converter
+from converter import (
+    DEFAULT_THRESHOLD, PRODUCT_CODE_COLUMN, PRODUCT_DESCRIPTION_COLUMN, STORE_PATTERN, ResultCache, clean_number,
+    convert_file, convert_order, output_frame, read_order_file
+)
+from enrichment import convert_checked, reconcile_totals
+from exporter import build_excel_export
+from incremental import convert_file_revision
+from streaming import iter_order_chunks, stream_convert_file
+
+STORE_HEADERS = ["7684 M", "8105 mm", "798", "1234MJET", "4321 Mm"]
+
+# (kod, açıklama, mağaza hücreleri): boş/boşluklu kodlar, tekrar eden ve sayısal
+# kodlar, metin miktarlar, eşik sınırı, negatif ve ondalıklı değerler
+EDGE_ROWS = [
+    ("30.77.0001-101", "ESL HS ÜÇGE R1001", [12, "1 200", None, "-", 9]),
+    ("30.78.0002-102", None, [10, 10.7, "12,5", " 75 ", ""]),
+    (None, "Ara başlık", [500, 500, 500, 500, 500]),
+    ("   ", "Boş kod", [100, None, None, None, None]),
+    ("30.77.0001-101", "ESL HS ÜÇGE R1001 (2)", [None, 24, "abc", -20, 1000]),
+    (40001, "Sayısal kod", [25, 50, None, "250,0", 11]),
+    ("30.79.0003-103", "Hiç sipariş yok", [None, None, 5, "-", 0]),
+    ("30.80.0004-104", "ESL HS ÜÇGE R1004", ["1 000", 150, 225, 6, 10]),
+]
+
+def write_order_sheet(path, rows, store_headers=STORE_HEADERS, totals=None):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["Sıra", PRODUCT_CODE_COLUMN, PRODUCT_DESCRIPTION_COLUMN, *store_headers, "Not", "TOPLAM"])
+    for number, (kod, description, cells) in enumerate(rows, start=1):
+        sheet.append([number, kod, description, *cells, "x", totals[number - 1] if totals else None])
+    workbook.save(path)
+    return path
+
+def reference_convert(path, original_filename, threshold=DEFAULT_THRESHOLD):
+    """İlk sürümdeki satır satır dönüşüm (iterrows) davranışı"""
+    df = pd.read_excel(path, engine="openpyxl")
+    store_cols = [col for col in df.columns if re.match(STORE_PATTERN, str(col))]
+    magaza_kodu = original_filename.rsplit('.', 1)[0]
+    rows, store_totals, product_totals, product_descriptions = [], {}, {}, {}
+    product_count = 0
+    for _, row in df.iterrows():
+        kod = row.get(PRODUCT_CODE_COLUMN, None)
+        if pd.isnull(kod) or str(kod).strip() == '':
+            continue
+        description = row.get(PRODUCT_DESCRIPTION_COLUMN, "")
+        if not pd.isnull(description):
+            product_descriptions[str(kod)] = str(description)
+        product_count += 1
+        for store_col in store_cols:
+            value = clean_number(row[store_col], threshold)
+            if value > 0:
+                magaza_kodu2 = re.search(r'^(\d{3,4})\s*[A-Za-z]*$', str(store_col)).group(1)
+                store_totals[magaza_kodu2] = store_totals.get(magaza_kodu2, 0) + value
+                product_totals[str(kod)] = product_totals.get(str(kod), 0) + value
+                rows.append((magaza_kodu, magaza_kodu2, str(kod), "" if pd.isnull(description) else str(description), value))
+    return rows, store_totals, product_count, len(store_cols), product_totals, product_descriptions
+
+def output_rows(output_df):
+    frame = output_frame(output_df)
+    columns = ["Mağaza Kodu", "Mağaza Kodu2", "Kod", "MALZEME TANIMI", "Adet"]
+    return [tuple(row) for row in frame[columns].astype(object).itertuples(index=False)]
+
+def sheet_rows(data, sheet_name="Siparişler"):
+    return [tuple(row) for row in load_workbook(BytesIO(data), read_only=True)[sheet_name].iter_rows(values_only=True)]
+
+@pytest.fixture
+def order_path(tmp_path):
+    return write_order_sheet(tmp_path / "Müşteri A.Ş. hafta1.xlsx", EDGE_ROWS)
+
+@pytest.mark.parametrize("threshold", [DEFAULT_THRESHOLD, 0, 100])
+def test_columnar_matches_reference(order_path, threshold):
+    rows, store_totals, product_count, store_count, product_totals, descriptions = reference_convert(
+        order_path, order_path.name, threshold
+    )
+    store_cols, _, result = convert_file(str(order_path), order_path.name, threshold)
+    output_df, new_store_totals, new_product_count, new_store_count, (new_product_totals, new_descriptions) = result
+    
+    assert [col.column for col in store_cols] == STORE_HEADERS
+    assert output_rows(output_df) == rows
+    assert new_store_totals == store_totals and list(new_store_totals) == list(store_totals)
+    assert new_product_totals == product_totals and list(new_product_totals) == list(product_totals)
+    assert new_descriptions == descriptions
+    assert (new_product_count, new_store_count) == (product_count, store_count)
+
+def test_streaming_matches_in_memory(order_path):
+    _, _, result = convert_file(str(order_path), order_path.name)
+    output = BytesIO()
+    _, _, summary = stream_convert_file(str(order_path), output, order_path.name, chunk_rows=3)
+    
+    row_count, store_totals, product_count, store_count, (product_totals, descriptions) = summary
+    assert row_count == len(result[0])
+    assert (store_totals, product_count, store_count) == result[1:4]
+    assert list(store_totals) == list(result[1])
+    assert (product_totals, descriptions) == result[4]
+    assert sheet_rows(output.getvalue()) == sheet_rows(build_excel_export(result))
+
+def test_no_store_columns(tmp_path):
+    path = tmp_path / "bos.xlsx"
+    workbook = Workbook()
+    workbook.active.append(["Sıra", PRODUCT_CODE_COLUMN, "Açıklama"])
+    workbook.active.append([1, "30.77.0001-101", "x"])
+    workbook.save(path)
+    
+    store_cols, column_preview, result = convert_file(str(path), path.name)
+    assert not store_cols and result is None
+    assert column_preview == ["Sıra", PRODUCT_CODE_COLUMN, "Açıklama"]
+    assert stream_convert_file(str(path), BytesIO(), path.name)[2] is None
+
+def test_incremental_matches_full_conversion(tmp_path):
+    first = write_order_sheet(tmp_path / "siparis_v1.xlsx", EDGE_ROWS)
+    revised_rows = list(EDGE_ROWS)
+    revised_rows[1] = ("30.78.0002-102", None, [10, 10.7, "12,5", " 80 ", ""])  # değişen satır
+    del revised_rows[5]  # silinen satır
+    revised_rows.insert(0, ("30.81.0005-105", "Yeni ürün", [None, 40, None, None, 15]))  # eklenen satır
+    second = write_order_sheet(tmp_path / "siparis_v2.xlsx", revised_rows)
+    snapshots = ResultCache()
+    
+    _, _, first_result, first_diff = convert_file_revision(str(first), first.name, snapshots)
+    assert first_diff is None
+    _, _, result, diff = convert_file_revision(str(second), second.name, snapshots)
+    _, _, full = convert_file(str(second), second.name)
+    
+    assert output_rows(result[0]) == output_rows(full[0])
+    assert result[1:4] == full[1:4] and list(result[1]) == list(full[1])
+    assert result[4] == full[4] and list(result[4][0]) == list(full[4][0])
+    
+    # Boş/boşluklu kodlu satırlar ürün sayılmaz; 6 üründen 4'ü değişmedi
+    assert (diff.source, diff.added, diff.removed, diff.changed, diff.unchanged) == (first.name, 1, 1, 1, 4)
+    store_changes = diff.changes.groupby("Mağaza Kodu2", observed=True)["Fark"].sum()
+    for store in set(first_result[1]) | set(result[1]):
+        assert result[1].get(store, 0) - first_result[1].get(store, 0) == store_changes.get(store, 0)
+
+def test_blanked_cell_changes_only_its_row(tmp_path):
+    rows = [(f"30.77.{number:04d}-1", f"Ürün {number}", [10 + number, 20, 30, 40, 50]) for number in range(10)]
+    first = write_order_sheet(tmp_path / "siparis_v1.xlsx", rows)
+    # Tek bir hücre boşaltılınca sütun int64'ten float64'e döner; diğer satırlar aynı kalmalı
+    rows[4] = (rows[4][0], rows[4][1], [None, 20, 30, 40, 50])
+    second = write_order_sheet(tmp_path / "siparis_v2.xlsx", rows)
+    snapshots = ResultCache()
+    
+    convert_file_revision(str(first), first.name, snapshots)
+    _, _, result, diff = convert_file_revision(str(second), second.name, snapshots)
+    
+    assert (diff.added, diff.removed, diff.changed, diff.unchanged) == (0, 0, 1, 9)
+    assert output_rows(result[0]) == output_rows(convert_file(str(second), second.name)[2][0])
+
+# Sayısal kod sütununda boşluklu ve boş hücreler: calamine ikisini de boş okur,
+# sütun float64 olur; kodlar yine de "12345" biçiminde yazılmalı
+NUMERIC_CODE_ROWS = [
+    (12345, "Birinci", [20, None, 30, None, None]),
+    ("  ", "Boşluklu kod", [100, None, None, None, None]),
+    (None, "Boş kod", [100, None, None, None, None]),
+    (40001, "  ", [None, 50, None, None, 12]),
+    (40002, 7.0, [None, None, None, 15, None]),
+]
+
+@pytest.mark.parametrize("engine", ["calamine", "openpyxl"])
+def test_numeric_codes_are_engine_independent(tmp_path, engine):
+    if engine == "calamine":
+        pytest.importorskip("python_calamine")
+    path = write_order_sheet(tmp_path / "sayisal.xlsx", NUMERIC_CODE_ROWS)
+    df, store_cols = read_order_file(str(path), engine=engine)
+    _, _, _, _, (product_totals, descriptions) = convert_order(df, store_cols, path.name)
+    
+    assert product_totals == {"12345": 20 + 30, "40001": 50 + 12, "40002": 15}
+    assert descriptions == {"12345": "Birinci", "40002": "7"}
+
+def test_streaming_numeric_codes_with_blanks(tmp_path):
+    # Aynı sayısal kod boş hücre içeren ve içermeyen parçalarda geçer
+    rows = []
+    for number in range(12):
+        code = None if number % 4 == 1 else 50000 + number % 3
+        rows.append((code, 900 + number % 3, [10 + number, None, 25, None, 40]))
+    path = write_order_sheet(tmp_path / "sayisal_akis.xlsx", rows)
+    _, _, result = convert_file(str(path), path.name)
+    output = BytesIO()
+    _, _, summary = stream_convert_file(str(path), output, path.name, chunk_rows=3)
+    
+    assert summary[1:4] == result[1:4]
+    assert summary[4] == result[4]
+    assert set(result[4][0]) == {"50000", "50001", "50002"}
+    assert sheet_rows(output.getvalue()) == sheet_rows(build_excel_export(result))
+    
+    chunks = iter_order_chunks(str(path), chunk_rows=3)
+    next(chunks)
+    for chunk in chunks:
+        codes = chunk[PRODUCT_CODE_COLUMN]
+        assert codes.dtype == object
+        assert all(isinstance(code, int) for code in codes.dropna())
+
+def test_products_without_descriptions(tmp_path):
+    path = write_order_sheet(tmp_path / "aciklamasiz.xlsx", [("30.1-1", None, [20] * 5), ("30.2-1", "  ", [30] * 5)])
+    _, _, result = convert_file(str(path), path.name)
+    assert result[4] == ({"30.1-1": 100, "30.2-1": 150}, {})
+    assert set(output_frame(result[0])["MALZEME TANIMI"]) == {""}
+
+def test_reconcile_uses_values_as_written(tmp_path):
+    # Ondalıklı, negatif ve metin miktarlar kırpılmadan toplanır
+    rows = [
+        ("30.1-1", "Ondalıklı", [10.5, 10.5, None, None, None]),
+        ("30.2-1", "Negatif", [30, -5, None, None, None]),
+        ("30.3-1", "Metin", ["0,1", "0,2", None, "-", None]),
+        ("30.4-1", "Tutmayan", [10.5, 10.5, None, None, None]),
+    ]
+    path = write_order_sheet(tmp_path / "toplam.xlsx", rows, totals=[21, 25, "0,3", 20])
+    df, store_cols = read_order_file(str(path))
+    reconciliation = reconcile_totals(df, store_cols)
+    
+    assert reconciliation.checked == 4
+    assert reconciliation.mismatches["Kod"].tolist() == ["30.4-1"]
+    assert reconciliation.mismatches[["Mağaza Toplamı", "TOPLAM", "Fark"]].iloc[0].tolist() == [21.0, 20.0, 1.0]
+
+def test_parsed_frame_is_reused_across_thresholds(order_path, monkeypatch):
+    reads = []
+    
+    def counting_read(*args, **kwargs):
+        reads.append(args[0])
+        return read_order_file(*args, **kwargs)
+    
+    monkeypatch.setattr(converter, "read_order_file", counting_read)
+    frames = ResultCache()
+    
+    for threshold in (DEFAULT_THRESHOLD, 0, 100):
+        (_, _, result), _, _ = convert_checked(str(order_path), order_path.name, threshold, frames=frames, digest="ozet")
+        assert output_rows(result[0]) == reference_convert(order_path, order_path.name, threshold)[0]
+    assert len(reads) == 1
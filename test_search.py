@@ -0,0 +1,48 @@
+"""Ürün arama indeksinin önek, alt metin ve Türkçe harf eşleşme testleri
+    
+    python -m pytest -q test_search.py
+"""
+import pytest
+
+from search import ProductSearchIndex
+
+DESCRIPTIONS = {
+    "30.77.0001-101": "SILIKON TABANCA",
+    "30.78.0002-102": "Silikon",
+    "11.30.77-9": "Kapı Kolu İç",
+    "30.7": "ıspanak",
+    "40001": "İNCİ KÜPE",
+}
+TOTALS = {"30.77.0001-101": 5, "30.78.0002-102": 50, "11.30.77-9": 100, "30.7": 1, "40001": 3}
+
+@pytest.fixture
+def index():
+    return ProductSearchIndex(DESCRIPTIONS, TOTALS)
+
+def test_code_prefix_matches_come_first(index):
+    # "11.30.77-9" en çok sipariş edilen ama kodu "30.77" ile başlamıyor
+    assert index.prefix("30.77") == ["30.77.0001-101"]
+    assert index.search("30.77") == ["30.77.0001-101", "11.30.77-9"]
+    assert index.search("30") == ["30.78.0002-102", "30.77.0001-101", "30.7", "11.30.77-9"]
+
+def test_substring_matches_ranked_by_total(index):
+    assert index.search("tabanca") == ["30.77.0001-101"]
+    assert index.search("kol") == ["11.30.77-9"]
+    assert index.search("yok") == []
+    assert index.search("  ") == []
+
+@pytest.mark.parametrize("query", ["silikon", "SILIKON", "SİLİKON", "sılıkon"])
+def test_dotted_and_dotless_i_match_ascii(index, query):
+    assert index.search(query) == ["30.78.0002-102", "30.77.0001-101"]
+
+@pytest.mark.parametrize("query, expected", [
+    ("kapi", ["11.30.77-9"]),
+    ("KAPI", ["11.30.77-9"]),
+    ("iç", ["11.30.77-9"]),
+    ("IÇ", ["11.30.77-9"]),
+    ("ispanak", ["30.7"]),
+    ("inci", ["40001"]),
+    ("İnci küpe", ["40001"]),
+])
+def test_turkish_letters(index, query, expected):
+    assert index.search(query) == expected